@@ -3,9 +3,23 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
-import glob
+import argparse
 from datetime import datetime
 
+from currency import FxRates
+from dimensions import DimensionStore, plain_labels
+from forecasting import forecast_sales, FORECAST_CONFIG
+from governor import MemoryGovernor, WORKER_OVERHEAD, parse_size, format_size, pop_column
+from heatmaps import analyze_heatmaps, HEATMAP_CONFIG
+from ingestion import find_raw_files, ingest_concurrently
+from parallel import PartitionedAggregator
+from pricing import analyze_pricing, PRICING_CONFIG
+from purchases import analyze_purchases, PURCHASE_CONFIG
+from ranking import analyze_rankings, ranking_columns, top_n, round_totals, RANKING_CONFIG
+from returns import analyze_returns, RETURN_DIMENSIONS
+from validation import DataQualityReport
+from result_cache import ResultCache
+
 # Set plot style - menggunakan style yang pasti tersedia
 plt.style.use('default')  # Menggunakan default style alih-alih 'seaborn'
 sns.set()  # Menggunakan pengaturan default seaborn
@@ -32,36 +46,19 @@ def find_data_files():
     
     print(f"Looking for data files in: {raw_data_dir}")
     
-    # Find retail files menggunakan path absolut
-    retail_files = glob.glob(os.path.join(raw_data_dir, "*retail*.csv")) + \
-                   glob.glob(os.path.join(raw_data_dir, "*retail*.xlsx"))
-                   
-    # Find e-commerce files menggunakan path absolut
-    ecommerce_files = glob.glob(os.path.join(raw_data_dir, "*commerce*.csv"))
-    
-    files = []
-    
-    # Add retail files
-    for file in retail_files:
-        file_type = "xlsx" if file.endswith(".xlsx") else "csv"
-        files.append({"path": file, "name": os.path.basename(file), "type": file_type})
-    
-    # Add e-commerce files
-    for file in ecommerce_files:
-        files.append({"path": file, "name": os.path.basename(file), "type": "csv"})
-    
-    return files
+    # Retail and e-commerce files, discovered the same way the watcher does
+    return find_raw_files(raw_data_dir, all_files=False)
 
-def examine_dataset(file_info):
-    """Examine a dataset and display basic information"""
+def examine_dataset(file_info, nrows=None):
+    """Examine a dataset and display basic information (of the first nrows rows if given)"""
     print_header(f"EXAMINING: {file_info['name']}")
     
     try:
         # Read the dataset
         if file_info["type"] == "xlsx":
-            df = pd.read_excel(file_info["path"])
+            df = pd.read_excel(file_info["path"], nrows=nrows)
         else:
-            df = pd.read_csv(file_info["path"], encoding='latin1', on_bad_lines='skip')
+            df = pd.read_csv(file_info["path"], encoding='latin1', on_bad_lines='skip', nrows=nrows)
         
         # Display basic information
         print(f"Shape: {df.shape}")
@@ -88,8 +85,47 @@ def examine_dataset(file_info):
         print(f"Error examining dataset: {e}")
         return None
 
-def clean_dataset(df, dataset_name):
-    """Clean and prepare the dataset for analysis"""
+def clean_file(file_info, governor, quality=None, dimensions=None, fx=None):
+    """Examine and clean one raw file, in chunks when it would not fit in the memory budget
+    
+    Returns lists of cleaned frames and cancellation/return frames (one per chunk).
+    """
+    row_bytes, n_rows = governor.estimate_rows(file_info)
+    chunk_rows = governor.chunk_rows(row_bytes)
+    
+    if n_rows is None or n_rows <= chunk_rows:
+        df = examine_dataset(file_info)
+        if df is None:
+            return [], []
+        df_clean, df_returns = clean_dataset(df, file_info['name'], quality, dimensions, fx)
+        return [df_clean], [df_returns]
+    
+    print(f"\n{file_info['name']}: ~{n_rows:,} rows at ~{row_bytes:,.0f} bytes/row in memory, "
+          f"cleaning in chunks of {chunk_rows:,} rows")
+    examine_dataset(file_info, nrows=chunk_rows)
+    
+    cleaned_dfs = []
+    returns_dfs = []
+    stem, ext = os.path.splitext(file_info['name'])
+    chunks = pd.read_csv(file_info["path"], encoding='latin1', on_bad_lines='skip', chunksize=chunk_rows)
+    for i, chunk in enumerate(chunks):
+        chunk['data_source'] = file_info['name']
+        df_clean, df_returns = clean_dataset(chunk, f"{stem}_part{i:03d}{ext}", quality, dimensions, fx)
+        del chunk
+        cleaned_dfs.append(df_clean)
+        returns_dfs.append(df_returns)
+        if governor.should_spill():
+            governor.spill(cleaned_dfs)
+    return cleaned_dfs, returns_dfs
+
+def clean_dataset(df, dataset_name, quality=None, dimensions=None, fx=None):
+    """Clean and prepare the dataset for analysis
+    
+    With a DataQualityReport, the validation rules are checked on the cleaned rows
+    in the same pass, before they are saved. With a DimensionStore, the dimension
+    columns of the returned frames are replaced by their integer IDs. With FxRates,
+    prices are converted to the reporting currency.
+    """
     print_header(f"CLEANING: {dataset_name}")
     
     if df is None:
@@ -115,6 +151,7 @@ def clean_dataset(df, dataset_name):
         'stock_code': 'stockcode',
         'unit price': 'unitprice',
         'unit_price': 'unitprice',
+        'price': 'unitprice',
         'invoice date': 'invoicedate',
         'invoice_date': 'invoicedate',
         'order date': 'invoicedate',
@@ -136,6 +173,16 @@ def clean_dataset(df, dataset_name):
             print(f"Found {missing_customer_id} rows with missing CustomerID")
             # We'll keep rows with missing CustomerID for now
     
+    # Route cancellations and returns into their own partition before they are filtered out
+    returns_mask = pd.Series(False, index=df_clean.index)
+    if 'invoiceno' in df_clean.columns:
+        returns_mask |= df_clean['invoiceno'].astype(str).str.startswith('C', na=False)
+    if 'quantity' in df_clean.columns:
+        returns_mask |= df_clean['quantity'] < 0
+    if 'unitprice' in df_clean.columns:
+        returns_mask &= df_clean['unitprice'] > 0
+    df_returns = df_clean[returns_mask]
+    
     # Handle quantity and price issues
     if 'quantity' in df_clean.columns:
         # Remove negative or zero quantities
@@ -163,10 +210,14 @@ def clean_dataset(df, dataset_name):
             df_clean = df_clean[~df_clean['invoiceno'].str.startswith('C', na=False)]
     
     # Convert InvoiceDate to datetime
+    unparsed = {}
     if 'invoicedate' in df_clean.columns:
         try:
+            raw_dates = df_clean['invoicedate']
             df_clean['invoicedate'] = pd.to_datetime(df_clean['invoicedate'], errors='coerce')
             print("Converted InvoiceDate to datetime format")
+            # Raw values that could not be parsed, for the quality report
+            unparsed['invoicedate'] = raw_dates.where(df_clean['invoicedate'].isna() & raw_dates.notna())
         except:
             print("Failed to convert InvoiceDate to datetime")
     
@@ -176,25 +227,77 @@ def clean_dataset(df, dataset_name):
         df_clean['totalprice'] = df_clean['quantity'] * df_clean['unitprice']
         print("Added TotalPrice column (Quantity * UnitPrice)")
     
-    # Add source column to track origin
-    df_clean['data_source'] = dataset_name
+    # Convert local-currency prices with the rate of each line's currency and date
+    if fx is not None:
+        fx.normalize(df_clean)
+    
+    # Add source column to track origin (coalesced batches already carry one per file)
+    if 'data_source' not in df_clean.columns:
+        df_clean['data_source'] = dataset_name
     
     # Final shape
     print(f"Final shape after cleaning: {df_clean.shape}")
     
+    if quality is not None:
+        quality.check(df_clean, unparsed)
+    
+    # Prepare the cancellations/returns partition with the same columns as the sales
+    df_returns = prepare_returns(df_returns, dataset_name)
+    if fx is not None:
+        fx.normalize(df_returns)
+    print(f"Kept {len(df_returns)} cancellation/return lines in a separate partition")
+    
     # Mendapatkan path untuk file cleaned
     current_dir = os.path.abspath(os.path.dirname(__file__))
     parent_dir = os.path.dirname(current_dir)
     clean_file = os.path.join(parent_dir, "data", "cleaned", f"{dataset_name.split('.')[0]}_clean.csv")
+    returns_file = os.path.join(parent_dir, "data", "cleaned", f"{dataset_name.split('.')[0]}_returns.csv")
     
     # Save cleaned dataset
     df_clean.to_csv(clean_file, index=False)
     print(f"Saved cleaned dataset to {clean_file}")
     
-    return df_clean
+    df_returns.to_csv(returns_file, index=False)
+    print(f"Saved cancellations/returns to {returns_file}")
+    
+    if dimensions is not None:
+        dimensions.encode_frame(df_clean)
+        dimensions.encode_frame(df_returns)
+    
+    return df_clean, df_returns
+
+def prepare_returns(df_returns, dataset_name):
+    """Type the cancellation/return lines split off by clean_dataset"""
+    df_returns = df_returns.copy()
+    
+    if 'invoiceno' in df_returns.columns:
+        df_returns['invoiceno'] = df_returns['invoiceno'].astype(str)
+        is_cancellation = df_returns['invoiceno'].str.startswith('C', na=False)
+    else:
+        is_cancellation = pd.Series(False, index=df_returns.index)
+    df_returns['return_type'] = pd.Categorical(
+        np.where(is_cancellation, 'cancellation', 'return'), categories=['cancellation', 'return'])
+    
+    if 'invoicedate' in df_returns.columns:
+        df_returns['invoicedate'] = pd.to_datetime(df_returns['invoicedate'], errors='coerce')
+    
+    # Returned quantity and value are stored as positive amounts
+    if 'quantity' in df_returns.columns:
+        df_returns['quantity'] = df_returns['quantity'].abs()
+        if 'unitprice' in df_returns.columns:
+            df_returns['totalprice'] = df_returns['quantity'] * df_returns['unitprice']
+    
+    if 'data_source' not in df_returns.columns:
+        df_returns['data_source'] = dataset_name
+    
+    return df_returns
 
-def merge_datasets(cleaned_dfs):
-    """Merge multiple cleaned datasets"""
+def merge_datasets(cleaned_dfs, output_prefix="combined_sales_data", dimensions=None):
+    """Merge multiple cleaned datasets
+    
+    With a DimensionStore, the integer ID columns are concatenated as integers and
+    returned as categoricals over the dimension dictionaries.
+    """
     print_header("MERGING DATASETS")
     
     if not cleaned_dfs:
@@ -209,20 +312,24 @@ def merge_datasets(cleaned_dfs):
         return None
     
     # Find common columns
-    all_columns = set()
+    all_columns = []
     for df in cleaned_dfs:
-        all_columns.update(df.columns)
-    
-    print(f"All columns across datasets: {all_columns}")
-    
-    # Ensure all dataframes have the same columns
-    for i, df in enumerate(cleaned_dfs):
-        for col in all_columns:
-            if col not in df.columns:
-                cleaned_dfs[i][col] = None
-    
-    # Concatenate all dataframes
-    merged_df = pd.concat(cleaned_dfs, ignore_index=True)
+        all_columns += [col for col in df.columns if col not in all_columns]
+    
+    print(f"All columns across datasets: {set(all_columns)}")
+    
+    # Concatenate column by column, taking each column out of the inputs (or reading it
+    # back from a spilled frame) as it is merged, so memory holds about one copy of the
+    # data instead of the inputs plus the result. Datasets without a column get missing values.
+    encoded = dimensions.columns if dimensions is not None else []
+    merged_columns = {}
+    for col in all_columns:
+        fill = -1 if col in encoded else None
+        merged_columns[col] = pd.concat([pop_column(df, col, fill) for df in cleaned_dfs], ignore_index=True)
+    merged_df = pd.DataFrame(merged_columns, copy=False)
+    del merged_columns
+    if dimensions is not None:
+        dimensions.decode_frame(merged_df)
     
     print(f"Shape of merged dataset: {merged_df.shape}")
     
@@ -230,7 +337,7 @@ def merge_datasets(cleaned_dfs):
     current_dir = os.path.abspath(os.path.dirname(__file__))
     parent_dir = os.path.dirname(current_dir)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    merged_file = os.path.join(parent_dir, "data", "cleaned", f"combined_sales_data_{timestamp}.csv")
+    merged_file = os.path.join(parent_dir, "data", "cleaned", f"{output_prefix}_{timestamp}.csv")
     
     # Save merged dataset
     merged_df.to_csv(merged_file, index=False)
@@ -238,25 +345,130 @@ def merge_datasets(cleaned_dfs):
     
     return merged_df
 
-def analyze_data(df):
-    """Perform comprehensive analysis on the merged dataset"""
-    print_header("ANALYZING DATA")
-    
-    if df is None:
-        print("No dataset to analyze.")
-        return
-    
-    # Mendapatkan paths untuk folder reports dan visualizations
-    current_dir = os.path.abspath(os.path.dirname(__file__))
-    parent_dir = os.path.dirname(current_dir)
-    reports_dir = os.path.join(parent_dir, "reports")
-    viz_dir = os.path.join(parent_dir, "visualizations")
-    
-    # Memastikan folder ada
-    os.makedirs(reports_dir, exist_ok=True)
-    os.makedirs(viz_dir, exist_ok=True)
-    
-    # Basic statistics
+def basic_statistics_frame(total_sales, num_transactions, num_customers, num_products, num_countries, date_range):
+    """Lay out the basic statistics as the Metric/Value table saved to basic_statistics.csv"""
+    stats = {
+        'Metric': ['Total Sales', 'Transactions', 'Customers', 'Products', 'Countries', 'Date Range'],
+        'Value': [
+            f"{total_sales:,.2f}" if isinstance(total_sales, (int, float)) else total_sales,
+            f"{num_transactions:,}" if isinstance(num_transactions, (int, float)) else num_transactions,
+            f"{num_customers:,}" if isinstance(num_customers, (int, float)) else num_customers,
+            f"{num_products:,}" if isinstance(num_products, (int, float)) else num_products,
+            f"{num_countries}" if isinstance(num_countries, (int, float)) else num_countries,
+            date_range
+        ]
+    }
+    return pd.DataFrame(stats)
+
+def add_month_labels(monthly_sales):
+    """Add month_name and period labels to a year/month sales table"""
+    monthly_sales['month_name'] = monthly_sales['month'].apply(lambda x: datetime(2000, x, 1).strftime('%b'))
+    monthly_sales['period'] = monthly_sales['year'].astype(str) + '-' + monthly_sales['month_name']
+    return monthly_sales
+
+def add_day_names(daily_sales):
+    """Add day_name labels to a dayofweek sales table"""
+    day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    daily_sales['day_name'] = daily_sales['dayofweek'].apply(lambda x: day_names[x])
+    return daily_sales
+
+def save_monthly_sales(monthly_sales, reports_dir, viz_dir):
+    """Plot and save the monthly sales report"""
+    monthly_sales = round_totals(monthly_sales)
+    
+    # Plot monthly sales
+    plt.figure(figsize=(15, 6))
+    plt.plot(monthly_sales['period'], monthly_sales['totalprice'], marker='o', linestyle='-')
+    plt.title('Monthly Sales Trend', fontsize=16)
+    plt.xlabel('Month', fontsize=12)
+    plt.ylabel('Total Sales', fontsize=12)
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    
+    # Save monthly sales chart
+    monthly_sales_chart = os.path.join(viz_dir, "monthly_sales_trend.png")
+    plt.savefig(monthly_sales_chart)
+    print(f"Saved monthly sales trend chart to {monthly_sales_chart}")
+    
+    # Save monthly sales data
+    monthly_sales_data = os.path.join(reports_dir, "monthly_sales.csv")
+    monthly_sales.to_csv(monthly_sales_data, index=False)
+    print(f"Saved monthly sales data to {monthly_sales_data}")
+
+def save_daily_sales(daily_sales, reports_dir, viz_dir):
+    """Plot and save the day-of-week sales report"""
+    daily_sales = round_totals(daily_sales)
+    
+    # Plot daily sales
+    plt.figure(figsize=(12, 6))
+    plt.bar(daily_sales['day_name'], daily_sales['totalprice'])
+    plt.title('Sales by Day of Week', fontsize=16)
+    plt.xlabel('Day', fontsize=12)
+    plt.ylabel('Total Sales', fontsize=12)
+    plt.grid(axis='y', alpha=0.3)
+    plt.tight_layout()
+    
+    # Save day of week chart
+    daily_sales_chart = os.path.join(viz_dir, "sales_by_day.png")
+    plt.savefig(daily_sales_chart)
+    print(f"Saved day of week sales chart to {daily_sales_chart}")
+    
+    # Save daily sales data
+    daily_sales_data = os.path.join(reports_dir, "daily_sales.csv")
+    daily_sales.to_csv(daily_sales_data, index=False)
+    print(f"Saved daily sales data to {daily_sales_data}")
+
+def save_top_products(top_products, reports_dir, viz_dir):
+    """Plot and save the top products report"""
+    top_products = round_totals(top_products)
+    
+    # Plot top products
+    plt.figure(figsize=(14, 8))
+    plt.barh(top_products['description'], top_products['totalprice'])
+    plt.title(f"Top {RANKING_CONFIG['top_n']} Products by Revenue", fontsize=16)
+    plt.xlabel('Total Revenue', fontsize=12)
+    plt.ylabel('Product', fontsize=12)
+    plt.gca().invert_yaxis()  # Highest value at top
+    plt.grid(axis='x', alpha=0.3)
+    plt.tight_layout()
+    
+    # Save top products chart
+    top_products_chart = os.path.join(viz_dir, "top_products.png")
+    plt.savefig(top_products_chart)
+    print(f"Saved top products chart to {top_products_chart}")
+    
+    # Save top products data
+    top_products_data = os.path.join(reports_dir, "top_products.csv")
+    top_products.to_csv(top_products_data, index=False)
+    print(f"Saved top products data to {top_products_data}")
+
+def save_country_sales(country_sales, reports_dir, viz_dir):
+    """Plot and save the top countries report"""
+    country_sales = round_totals(country_sales)
+    
+    # Plot top countries
+    plt.figure(figsize=(12, 6))
+    plt.bar(country_sales['country'], country_sales['totalprice'])
+    plt.title(f"Top {RANKING_CONFIG['top_n']} Countries by Sales", fontsize=16)
+    plt.xlabel('Country', fontsize=12)
+    plt.ylabel('Total Sales', fontsize=12)
+    plt.xticks(rotation=45)
+    plt.grid(axis='y', alpha=0.3)
+    plt.tight_layout()
+    
+    # Save top countries chart
+    country_sales_chart = os.path.join(viz_dir, "top_countries.png")
+    plt.savefig(country_sales_chart)
+    print(f"Saved top countries chart to {country_sales_chart}")
+    
+    # Save country data
+    country_sales_data = os.path.join(reports_dir, "country_sales.csv")
+    country_sales.to_csv(country_sales_data, index=False)
+    print(f"Saved country sales data to {country_sales_data}")
+
+def analyze_basic_statistics(df, reports_dir, viz_dir):
+    """Compute and save the headline statistics"""
     print("\n=== Basic Statistics ===")
     
     # Total sales
@@ -310,22 +522,13 @@ def analyze_data(df):
         print("InvoiceDate column not found or not in datetime format")
     
     # Save basic statistics to CSV
-    stats = {
-        'Metric': ['Total Sales', 'Transactions', 'Customers', 'Products', 'Countries', 'Date Range'],
-        'Value': [
-            f"{total_sales:,.2f}" if isinstance(total_sales, (int, float)) else total_sales,
-            f"{num_transactions:,}" if isinstance(num_transactions, (int, float)) else num_transactions,
-            f"{num_customers:,}" if isinstance(num_customers, (int, float)) else num_customers,
-            f"{num_products:,}" if isinstance(num_products, (int, float)) else num_products,
-            f"{num_countries}" if isinstance(num_countries, (int, float)) else num_countries,
-            date_range
-        ]
-    }
+    stats = basic_statistics_frame(total_sales, num_transactions, num_customers, num_products, num_countries, date_range)
     stats_file = os.path.join(reports_dir, "basic_statistics.csv")
-    pd.DataFrame(stats).to_csv(stats_file, index=False)
+    stats.to_csv(stats_file, index=False)
     print(f"Saved basic statistics to {stats_file}")
-    
-    # Time-based analysis
+
+def analyze_time(df, reports_dir, viz_dir):
+    """Monthly and day-of-week sales"""
     if 'invoicedate' in df.columns and pd.api.types.is_datetime64_dtype(df['invoicedate']):
         print("\n=== Time-Based Analysis ===")
         
@@ -340,145 +543,347 @@ def analyze_data(df):
         # Monthly sales
         if 'totalprice' in df.columns:
             monthly_sales = df.groupby([df['year'], df['month']])['totalprice'].sum().reset_index()
-            monthly_sales['month_name'] = monthly_sales['month'].apply(lambda x: datetime(2000, x, 1).strftime('%b'))
-            monthly_sales['period'] = monthly_sales['year'].astype(str) + '-' + monthly_sales['month_name']
-            
-            # Plot monthly sales
-            plt.figure(figsize=(15, 6))
-            plt.plot(monthly_sales['period'], monthly_sales['totalprice'], marker='o', linestyle='-')
-            plt.title('Monthly Sales Trend', fontsize=16)
-            plt.xlabel('Month', fontsize=12)
-            plt.ylabel('Total Sales', fontsize=12)
-            plt.xticks(rotation=45)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            # Save monthly sales chart
-            monthly_sales_chart = os.path.join(viz_dir, "monthly_sales_trend.png")
-            plt.savefig(monthly_sales_chart)
-            print(f"Saved monthly sales trend chart to {monthly_sales_chart}")
+            monthly_sales = add_month_labels(monthly_sales)
             
-            # Save monthly sales data
-            monthly_sales_data = os.path.join(reports_dir, "monthly_sales.csv")
-            monthly_sales.to_csv(monthly_sales_data, index=False)
-            print(f"Saved monthly sales data to {monthly_sales_data}")
+            save_monthly_sales(monthly_sales, reports_dir, viz_dir)
         
         # Day of week analysis
         if 'totalprice' in df.columns:
-            day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
             daily_sales = df.groupby('dayofweek')['totalprice'].sum().reset_index()
-            daily_sales['day_name'] = daily_sales['dayofweek'].apply(lambda x: day_names[x])
+            daily_sales = add_day_names(daily_sales)
             
-            # Plot daily sales
-            plt.figure(figsize=(12, 6))
-            plt.bar(daily_sales['day_name'], daily_sales['totalprice'])
-            plt.title('Sales by Day of Week', fontsize=16)
-            plt.xlabel('Day', fontsize=12)
-            plt.ylabel('Total Sales', fontsize=12)
-            plt.grid(axis='y', alpha=0.3)
-            plt.tight_layout()
-            
-            # Save day of week chart
-            daily_sales_chart = os.path.join(viz_dir, "sales_by_day.png")
-            plt.savefig(daily_sales_chart)
-            print(f"Saved day of week sales chart to {daily_sales_chart}")
-            
-            # Save daily sales data
-            daily_sales_data = os.path.join(reports_dir, "daily_sales.csv")
-            daily_sales.to_csv(daily_sales_data, index=False)
-            print(f"Saved daily sales data to {daily_sales_data}")
-    
-    # Product analysis
+            save_daily_sales(daily_sales, reports_dir, viz_dir)
+
+def analyze_products(df, reports_dir, viz_dir):
+    """Top products by revenue"""
     if all(col in df.columns for col in ['description', 'totalprice']):
         print("\n=== Product Analysis ===")
         
         # Top products by revenue
-        top_products = df.groupby('description')['totalprice'].sum().reset_index()
-        top_products = top_products.sort_values('totalprice', ascending=False).head(10)
+        top_products = df.groupby('description', observed=True)['totalprice'].sum().reset_index()
+        top_products = plain_labels(top_products, 'description')
+        top_products = top_n(top_products, 'totalprice', RANKING_CONFIG['top_n'])
         
-        # Plot top products
-        plt.figure(figsize=(14, 8))
-        plt.barh(top_products['description'], top_products['totalprice'])
-        plt.title('Top 10 Products by Revenue', fontsize=16)
-        plt.xlabel('Total Revenue', fontsize=12)
-        plt.ylabel('Product', fontsize=12)
-        plt.gca().invert_yaxis()  # Highest value at top
-        plt.grid(axis='x', alpha=0.3)
-        plt.tight_layout()
-        
-        # Save top products chart
-        top_products_chart = os.path.join(viz_dir, "top_products.png")
-        plt.savefig(top_products_chart)
-        print(f"Saved top products chart to {top_products_chart}")
-        
-        # Save top products data
-        top_products_data = os.path.join(reports_dir, "top_products.csv")
-        top_products.to_csv(top_products_data, index=False)
-        print(f"Saved top products data to {top_products_data}")
-    
-    # Country analysis
+        save_top_products(top_products, reports_dir, viz_dir)
+
+def analyze_countries(df, reports_dir, viz_dir):
+    """Top countries by sales"""
     if all(col in df.columns for col in ['country', 'totalprice']):
         print("\n=== Country Analysis ===")
         
         # Sales by country
-        country_sales = df.groupby('country')['totalprice'].sum().reset_index()
-        country_sales = country_sales.sort_values('totalprice', ascending=False).head(10)
+        country_sales = df.groupby('country', observed=True)['totalprice'].sum().reset_index()
+        country_sales = plain_labels(country_sales, 'country')
+        country_sales = top_n(country_sales, 'totalprice', RANKING_CONFIG['top_n'])
+        
+        save_country_sales(country_sales, reports_dir, viz_dir)
+
+def partitioned_stage_runs(aggregator):
+    """Core report stages built from partitioned partial aggregates instead of the full frame"""
+    def basic_statistics(df, reports_dir, viz_dir):
+        print("\n=== Basic Statistics ===")
+        results = aggregator.result()
+        stats = basic_statistics_frame(results['total_sales'], results['num_transactions'], results['num_customers'],
+                                       results['num_products'], results['num_countries'], results['date_range'])
+        for metric, value in zip(stats['Metric'], stats['Value']):
+            print(f"{metric}: {value}")
+        stats_file = os.path.join(reports_dir, "basic_statistics.csv")
+        stats.to_csv(stats_file, index=False)
+        print(f"Saved basic statistics to {stats_file}")
+    
+    def time_sales(df, reports_dir, viz_dir):
+        results = aggregator.result()
+        if 'monthly_sales' in results:
+            print("\n=== Time-Based Analysis ===")
+            save_monthly_sales(add_month_labels(results['monthly_sales']), reports_dir, viz_dir)
+            save_daily_sales(add_day_names(results['daily_sales']), reports_dir, viz_dir)
+    
+    def top_products(df, reports_dir, viz_dir):
+        results = aggregator.result()
+        if 'product_sales' in results:
+            print("\n=== Product Analysis ===")
+            top = top_n(results['product_sales'], 'totalprice', RANKING_CONFIG['top_n'])
+            save_top_products(top, reports_dir, viz_dir)
+    
+    def country_sales(df, reports_dir, viz_dir):
+        results = aggregator.result()
+        if 'country_sales' in results:
+            print("\n=== Country Analysis ===")
+            top = top_n(results['country_sales'], 'totalprice', RANKING_CONFIG['top_n'])
+            save_country_sales(top, reports_dir, viz_dir)
+    
+    return {
+        'basic_statistics': basic_statistics,
+        'time_sales': time_sales,
+        'top_products': top_products,
+        'country_sales': country_sales,
+    }
+
+def report_stages(returns_df=None):
+    """Report stages run by analyze_data, with the inputs and outputs the result cache tracks
+
+    Each stage lists the merged-data columns it reads, any extra input frames, the
+    configuration that shapes its output, the other modules its code depends on and
+    the files it writes (relative to the project root). A stage is only rerun when
+    one of those inputs changes.
+    """
+    stages = [
+        {
+            'name': 'basic_statistics',
+            'run': analyze_basic_statistics,
+            'columns': ['totalprice', 'invoiceno', 'customerid', 'description', 'country', 'invoicedate'],
+            'outputs': ['reports/basic_statistics.csv'],
+        },
+        {
+            'name': 'time_sales',
+            'run': analyze_time,
+            'columns': ['invoicedate', 'totalprice'],
+            'sources': ['ranking'],
+            'outputs': ['reports/monthly_sales.csv', 'reports/daily_sales.csv',
+                        'visualizations/monthly_sales_trend.png', 'visualizations/sales_by_day.png'],
+        },
+        {
+            'name': 'top_products',
+            'run': analyze_products,
+            'columns': ['description', 'totalprice'],
+            'sources': ['ranking', 'dimensions'],
+            'config': {'top_n': RANKING_CONFIG['top_n']},
+            'outputs': ['reports/top_products.csv', 'visualizations/top_products.png'],
+        },
+        {
+            'name': 'country_sales',
+            'run': analyze_countries,
+            'columns': ['country', 'totalprice'],
+            'sources': ['ranking', 'dimensions'],
+            'config': {'top_n': RANKING_CONFIG['top_n']},
+            'outputs': ['reports/country_sales.csv', 'visualizations/top_countries.png'],
+        },
+    ]
+    
+    if returns_df is not None:
+        stages.append({
+            'name': 'return_rates',
+            'run': lambda df, reports_dir, viz_dir: analyze_returns(df, returns_df, reports_dir),
+            'source': analyze_returns,
+            'sources': ['analysis', 'ranking'],
+            'columns': ['description', 'country', 'invoicedate', 'quantity', 'totalprice'],
+            'inputs': {'returns': returns_df},
+            'outputs': [f'reports/return_rates_by_{name}.csv' for name in RETURN_DIMENSIONS],
+        })
+    
+    stages += [
+        {
+            'name': 'pricing',
+            'run': analyze_pricing,
+            'sources': ['ranking'],
+            'columns': ['stockcode', 'description', 'unitprice', 'quantity', 'invoicedate'],
+            'config': PRICING_CONFIG,
+            'outputs': ['reports/price_statistics.csv', 'reports/price_elasticity.csv',
+                        'visualizations/price_elasticity.png'],
+        },
+        {
+            'name': 'purchases',
+            'run': analyze_purchases,
+            'sources': ['pricing'],
+            'columns': ['customerid', 'invoicedate', 'totalprice'],
+            'config': PURCHASE_CONFIG,
+            'outputs': ['reports/interpurchase_intervals.csv', 'reports/customer_activity.csv',
+                        'reports/session_distribution.csv', 'visualizations/interpurchase_intervals.png'],
+        },
+        {
+            'name': 'rankings',
+            'run': lambda df, reports_dir, viz_dir: analyze_rankings(df, reports_dir),
+            'source': analyze_rankings,
+            'columns': ranking_columns(),
+            'config': RANKING_CONFIG,
+            'outputs': [f"reports/{ranking['name']}.csv" for ranking in RANKING_CONFIG['rankings']],
+        },
+        {
+            'name': 'heatmaps',
+            'run': analyze_heatmaps,
+            'columns': ['invoicedate', 'totalprice', 'country', 'description'],
+            'config': HEATMAP_CONFIG,
+            'outputs': [f'{folder}/heatmap_{name}.{ext}'
+                        for name in ['hour_weekday', 'country_month', 'product_month']
+                        for folder, ext in [('reports', 'csv'), ('visualizations', 'png')]],
+        },
+        {
+            'name': 'forecasts',
+            'run': lambda df, reports_dir, viz_dir: forecast_sales(df, reports_dir),
+            'source': forecast_sales,
+            'columns': ['invoicedate', 'totalprice', 'country', 'description'],
+            'config': FORECAST_CONFIG,
+            'outputs': ['reports/forecasts.csv'],
+        },
+    ]
+    return stages
+
+def analyze_data(df, returns_df=None, cache=None, aggregator=None):
+    """Perform comprehensive analysis on the merged dataset
+    
+    With a ResultCache, stages whose inputs and configuration are unchanged since a
+    previous run are restored from the cache instead of being recomputed. With a
+    PartitionedAggregator, the core reports are computed by parallel workers.
+    """
+    print_header("ANALYZING DATA")
+    
+    if df is None:
+        print("No dataset to analyze.")
+        return
+    
+    # Mendapatkan paths untuk folder reports dan visualizations
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    parent_dir = os.path.dirname(current_dir)
+    reports_dir = os.path.join(parent_dir, "reports")
+    viz_dir = os.path.join(parent_dir, "visualizations")
+    
+    # Memastikan folder ada
+    os.makedirs(reports_dir, exist_ok=True)
+    os.makedirs(viz_dir, exist_ok=True)
+    
+    stages = report_stages(returns_df)
+    if aggregator is not None:
+        parallel_runs = partitioned_stage_runs(aggregator)
+        for stage in stages:
+            if stage['name'] in parallel_runs:
+                stage['source'] = stage['run']
+                stage['run'] = parallel_runs[stage['name']]
+                stage['sources'] = stage.get('sources', []) + ['parallel']
+    
+    for stage in stages:
+        outputs = [os.path.join(parent_dir, path) for path in stage['outputs']]
         
-        # Plot top countries
-        plt.figure(figsize=(12, 6))
-        plt.bar(country_sales['country'], country_sales['totalprice'])
-        plt.title('Top 10 Countries by Sales', fontsize=16)
-        plt.xlabel('Country', fontsize=12)
-        plt.ylabel('Total Sales', fontsize=12)
-        plt.xticks(rotation=45)
-        plt.grid(axis='y', alpha=0.3)
-        plt.tight_layout()
+        if cache is None:
+            stage['run'](df, reports_dir, viz_dir)
+            continue
         
-        # Save top countries chart
-        country_sales_chart = os.path.join(viz_dir, "top_countries.png")
-        plt.savefig(country_sales_chart)
-        print(f"Saved top countries chart to {country_sales_chart}")
+        key = cache.key(stage['name'], df, stage['columns'], stage.get('config'),
+                        stage.get('source', stage['run']), stage.get('inputs'), stage.get('sources'))
+        if cache.restore(stage['name'], key, outputs):
+            print(f"\n=== {stage['name']}: inputs unchanged, restored from cache ===")
+            continue
         
-        # Save country data
-        country_sales_data = os.path.join(reports_dir, "country_sales.csv")
-        country_sales.to_csv(country_sales_data, index=False)
-        print(f"Saved country sales data to {country_sales_data}")
+        stage['run'](df, reports_dir, viz_dir)
+        cache.store(stage['name'], key, outputs)
+    
+    if cache is not None:
+        cache.evict()
+        print(f"\nResult cache: {cache.hits} stages restored, {cache.misses} recomputed")
     
     print("\nAnalysis completed successfully!")
 
 def main():
     """Main function to run the complete analysis pipeline"""
+    parser = argparse.ArgumentParser(description="Online store sales analysis pipeline")
+    parser.add_argument("--ingest", choices=["sequential", "concurrent"], default="sequential",
+                        help="Read raw files one after another, or concurrently in coalesced batches")
+    parser.add_argument("--workers", type=int, default=8, help="Reader threads for concurrent ingestion")
+    parser.add_argument("--batch-rows", type=int, default=500_000,
+                        help="Target rows per coalesced batch for concurrent ingestion")
+    parser.add_argument("--parallel-workers", type=int, default=1,
+                        help="Worker processes for partitioned aggregation of the core reports (1 = off)")
+    parser.add_argument("--partition-by", choices=["source", "month"], default="source",
+                        help="How the merged data is split for partitioned aggregation")
+    parser.add_argument("--top-n", type=int, default=RANKING_CONFIG['top_n'],
+                        help="Number of products and countries in the top products/countries reports")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute every report even if its inputs are unchanged")
+    parser.add_argument("--cache-size-mb", type=int, default=500, help="Size limit of the result cache")
+    parser.add_argument("--fx-rates", help="Daily FX rate file (default: data/fx/fx_rates.csv)")
+    parser.add_argument("--memory-budget", type=parse_size,
+                        help="Memory the run may use, e.g. 4GB (default: 75%% of the available memory)")
+    args = parser.parse_args()
+    RANKING_CONFIG['top_n'] = args.top_n
+    
     print_header("ONLINE STORE SALES ANALYSIS")
     
-    # Find available data files
-    data_files = find_data_files()
+    # Row-level data quality rules are checked while each dataset is cleaned, group rules on the merged data
+    quality = DataQualityReport()
     
-    if not data_files:
-        print("No data files found. Please add data files to the data/raw directory.")
-        return
+    # Chunk sizes and worker counts are derived from the memory budget
+    governor = MemoryGovernor(args.memory_budget)
+    print(f"Memory budget: {format_size(governor.budget)}")
     
-    print(f"Found {len(data_files)} data files:")
-    for file in data_files:
-        print(f"- {file['name']} ({file['type']})")
+    # Dimension columns are stored as integer IDs that stay stable across runs
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    parent_dir = os.path.dirname(current_dir)
+    dimensions = DimensionStore(os.path.join(parent_dir, "data", "dimensions"))
     
-    # Process each file
-    cleaned_dfs = []
+    # Prices are converted to the reporting currency when an FX rate file is present
+    fx_file = args.fx_rates or os.path.join(parent_dir, "data", "fx", "fx_rates.csv")
+    fx = FxRates.from_file(fx_file)
+    if fx is None:
+        print(f"No FX rate file at {fx_file}; amounts are used in their recorded currency")
+    else:
+        print(f"Loaded {len(fx.keys):,} FX rates for {', '.join(fx.currencies)} from {fx_file}")
     
-    for file in data_files:
-        # Examine dataset
-        df = examine_dataset(file)
+    if args.ingest == "concurrent":
+        # Read every file in data/raw concurrently and clean them in batches
+        raw_data_dir = os.path.join(parent_dir, "data", "raw")
+        clean = lambda df, dataset_name: clean_dataset(df, dataset_name, quality, dimensions, fx)
+        cleaned_dfs, returns_dfs = ingest_concurrently(raw_data_dir, clean, args.workers, args.batch_rows, governor)
+        
+        if not cleaned_dfs:
+            print("No data files found. Please add data files to the data/raw directory.")
+            return
+    else:
+        # Find available data files
+        data_files = find_data_files()
         
-        # Clean dataset
-        if df is not None:
-            df_clean = clean_dataset(df, file['name'])
-            cleaned_dfs.append(df_clean)
+        if not data_files:
+            print("No data files found. Please add data files to the data/raw directory.")
+            return
+        
+        print(f"Found {len(data_files)} data files:")
+        for file in data_files:
+            print(f"- {file['name']} ({file['type']})")
+        
+        # Process each file
+        cleaned_dfs = []
+        returns_dfs = []
+        
+        for file in data_files:
+            # Examine and clean dataset
+            file_cleaned, file_returns = clean_file(file, governor, quality, dimensions, fx)
+            cleaned_dfs.extend(file_cleaned)
+            returns_dfs.extend(file_returns)
+            
+            # Move cleaned data to disk while the next files are processed
+            if governor.should_spill():
+                governor.spill(cleaned_dfs)
+                governor.spill(returns_dfs)
     
     # Merge datasets
-    merged_df = merge_datasets(cleaned_dfs)
+    merged_df = merge_datasets(cleaned_dfs, dimensions=dimensions)
+    merged_returns = merge_datasets(returns_dfs, "combined_returns_data", dimensions)
+    del cleaned_dfs, returns_dfs
+    
+    print("\n=== Dimension Dictionaries ===")
+    dimensions.save()
+    
+    # Check the group rules on the merged data and save the data quality report
+    print_header("DATA QUALITY")
+    if merged_df is not None:
+        quality.check_groups(merged_df)
+    quality.save(os.path.join(parent_dir, "reports"))
+    
+    # Result cache for report outputs, keyed by the data and configuration they depend on
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(os.path.join(parent_dir, "data", "cache"), args.cache_size_mb * 1024 * 1024)
     
     # Analyze data
     if merged_df is not None:
-        analyze_data(merged_df)
+        aggregator = None
+        if args.parallel_workers > 1:
+            # Each worker maps its share of six 8-byte columns
+            per_worker = WORKER_OVERHEAD + len(merged_df) * 48 // args.parallel_workers
+            workers = governor.workers(args.parallel_workers, per_worker, "aggregation workers")
+            aggregator = PartitionedAggregator(merged_df, workers, args.partition_by)
+        analyze_data(merged_df, merged_returns, cache, aggregator)
+    
+    print("\n=== Memory Usage ===")
+    governor.report()
     
     print_header("ANALYSIS COMPLETED")
     print("Check the 'reports' and 'visualizations' directories for results.")
@@ -0,0 +1,108 @@
+import os
+import numpy as np
+import pandas as pd
+
+EURO_COUNTRIES = ['Austria', 'Belgium', 'Cyprus', 'EIRE', 'Finland', 'France', 'Germany', 'Greece', 'Italy',
+                  'Lithuania', 'Malta', 'Netherlands', 'Portugal', 'Spain', 'European Community']
+
+# Currency settings used by clean_dataset when an FX rate file is present
+CURRENCY_CONFIG = {
+    'reporting_currency': 'GBP',   # Currency the rates are quoted in and every report is in
+    'default_currency': 'GBP',     # Currency of lines whose country is not listed below
+    'country_currency': {**{country: 'EUR' for country in EURO_COUNTRIES}, 'USA': 'USD'},
+}
+
+# Days are stored in the low 32 bits of the (currency, day) lookup keys
+DAY_BITS = 32
+DAY_OFFSET = 1 << 31
+
+def lookup_keys(currency_codes, days):
+    return (currency_codes.astype(np.int64) << DAY_BITS) + (days + DAY_OFFSET)
+
+class FxRates:
+    """Daily FX rates with a vectorized as-of lookup by (currency, date)
+
+    The rate file has one row per currency and day, `date,currency,rate`, with
+    the rate in reporting currency per unit. Rates are sorted once by a combined
+    (currency, day) key, so every line finds the latest rate on or before its
+    invoice date with a single np.searchsorted over the whole column.
+    """
+
+    def __init__(self, rates, config=CURRENCY_CONFIG):
+        self.config = config
+        rates = rates.dropna(subset=['date', 'currency', 'rate'])
+        self.currencies = pd.Index(sorted(rates['currency'].unique()))
+
+        currency_codes = self.currencies.get_indexer(rates['currency'])
+        days = pd.to_datetime(rates['date']).to_numpy(dtype='M8[D]').astype(np.int64)
+        keys = lookup_keys(currency_codes, days)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.key_currency = currency_codes[order]
+        self.rates = rates['rate'].to_numpy(dtype=float)[order]
+
+    @classmethod
+    def from_file(cls, path, config=CURRENCY_CONFIG):
+        """Load a rate file, or None when there is none"""
+        if not os.path.exists(path):
+            return None
+        rates = pd.read_csv(path)
+        rates.columns = [str(col).lower().strip() for col in rates.columns]
+        missing = {'date', 'currency', 'rate'} - set(rates.columns)
+        if missing:
+            raise ValueError(f"FX rate file {path} is missing columns: {sorted(missing)}")
+        return cls(rates, config)
+
+    def currency(self, country):
+        """Currency of every line, mapped from its country"""
+        default = self.config['default_currency']
+        codes, countries = pd.factorize(country)
+        currencies = [self.config['country_currency'].get(name, default) for name in countries]
+        categories = pd.Index(sorted(set(currencies) | {default}))
+        # Lines without a country (code -1) pick the default appended at the end
+        currency_codes = np.r_[categories.get_indexer(currencies), categories.get_loc(default)]
+        return pd.Categorical.from_codes(currency_codes[codes], categories=categories)
+
+    def rate(self, currencies, dates):
+        """As-of rate for every line: the latest rate of its currency on or before its date"""
+        currencies = pd.Categorical(currencies)
+        # Codes into the rate table's currencies (-1 for currencies without rates)
+        table_codes = np.r_[self.currencies.get_indexer(currencies.categories), -1]
+        currency_codes = table_codes[currencies.codes]
+        days = pd.to_datetime(dates).to_numpy(dtype='M8[D]')
+        valid_day = ~np.isnat(days)
+        days = np.where(valid_day, days, np.datetime64(0, 'D')).astype(np.int64)
+
+        position = np.searchsorted(self.keys, lookup_keys(currency_codes, days), side='right') - 1
+        found = (position >= 0) & valid_day & (currency_codes >= 0)
+        found[found] = self.key_currency[position[found]] == currency_codes[found]
+        rates = np.where(found, self.rates[np.maximum(position, 0)], np.nan)
+
+        # Lines already in the reporting currency need no rate
+        reporting = currencies.categories.get_indexer([self.config['reporting_currency']])[0]
+        if reporting >= 0:
+            rates[currencies.codes == reporting] = 1.0
+        return rates
+
+    def normalize(self, df):
+        """Convert unitprice and totalprice to the reporting currency, keeping the local amounts"""
+        if 'invoicedate' not in df.columns or 'unitprice' not in df.columns:
+            return df
+
+        if 'currency' not in df.columns:
+            country = df['country'] if 'country' in df.columns else pd.Series(np.nan, index=df.index)
+            df['currency'] = self.currency(country)
+        df['fx_rate'] = self.rate(df['currency'], df['invoicedate'])
+
+        df['unitprice_local'] = df['unitprice']
+        df['unitprice'] = df['unitprice_local'] * df['fx_rate']
+        if 'totalprice' in df.columns:
+            df['totalprice_local'] = df['totalprice']
+            df['totalprice'] = df['totalprice_local'] * df['fx_rate']
+
+        missing = df['fx_rate'].isna().sum()
+        print(f"Converted prices to {self.config['reporting_currency']} "
+              f"({df['currency'].nunique()} currencies)")
+        if missing > 0:
+            print(f"No FX rate on or before the invoice date for {missing} rows; their amounts are left empty")
+        return df
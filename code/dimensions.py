@@ -0,0 +1,104 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Columns stored as integer IDs into a persistent dictionary
+DIMENSION_COLUMNS = ['customerid', 'invoiceno', 'description', 'stockcode', 'country']
+
+class DimensionDictionary:
+    """Append-only mapping of the distinct values of one column to stable integer IDs
+
+    Labels are kept as strings, one JSON-encoded label per line, and a label's ID
+    is its line number. New labels are only ever appended, so an ID handed out in
+    one run means the same value in every later run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        labels = []
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                labels = [json.loads(line) for line in f if line.strip()]
+        self.labels = pd.Index(labels, dtype=object)
+        self.saved = len(labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def encode(self, values):
+        """Integer IDs of a column's values (-1 for missing), adding unseen values to the dictionary"""
+        codes, uniques = pd.factorize(values)
+        if len(uniques) == 0:
+            return np.full(len(codes), -1, dtype=np.int32)
+        # Values that only differ in type (1 and '1') share a label
+        key_codes, keys = pd.factorize(np.asarray(uniques).astype(str))
+        keys = pd.Index(keys, dtype=object)
+        ids = self.labels.get_indexer(keys)
+
+        new = ids < 0
+        if new.any():
+            self.labels = self.labels.append(keys[new])
+            ids[new] = np.arange(len(self.labels) - new.sum(), len(self.labels))
+
+        return np.where(codes >= 0, ids[key_codes][codes], -1).astype(np.int32)
+
+    def decode(self, codes):
+        """Categorical over the whole dictionary, so the category codes are the stored IDs"""
+        return pd.Categorical.from_codes(codes, categories=self.labels)
+
+    def save(self):
+        """Append the labels added since the dictionary was loaded"""
+        if self.saved == len(self.labels):
+            return 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for label in self.labels[self.saved:]:
+                f.write(json.dumps(label) + "\n")
+        added = len(self.labels) - self.saved
+        self.saved = len(self.labels)
+        return added
+
+class DimensionStore:
+    """The dimension dictionaries of the fact columns, kept under one directory
+
+    clean_dataset replaces the dimension columns with int32 IDs, so cleaned frames
+    are concatenated as integers, and merge_datasets turns them into categoricals
+    over the full dictionaries: groupbys and distinct counts then work on the
+    integer codes and labels are only materialized when reports are written.
+    """
+
+    def __init__(self, store_dir, columns=DIMENSION_COLUMNS):
+        self.store_dir = store_dir
+        self.columns = columns
+        self.dictionaries = {column: DimensionDictionary(os.path.join(store_dir, f"{column}.jsonl"))
+                             for column in columns}
+
+    def encode_frame(self, df):
+        """Replace the dimension columns of a frame with their integer IDs"""
+        for column in self.columns:
+            if column in df.columns:
+                df[column] = self.dictionaries[column].encode(df[column])
+        return df
+
+    def decode_frame(self, df):
+        """Turn integer ID columns into categoricals whose codes are the IDs"""
+        for column in self.columns:
+            if column in df.columns:
+                df[column] = self.dictionaries[column].decode(df[column].to_numpy())
+        return df
+
+    def save(self):
+        """Persist new labels and report the dictionary sizes"""
+        for column, dictionary in self.dictionaries.items():
+            added = dictionary.save()
+            print(f"{column}: {len(dictionary):,} IDs ({added:,} new)")
+
+def plain_labels(table, column):
+    """Decode a categorical group column of an aggregated table to plain labels
+
+    Rows are put in label order, the order a groupby on the string column gives.
+    """
+    if isinstance(table[column].dtype, pd.CategoricalDtype):
+        table = table.astype({column: object}).sort_values(column, kind='stable', ignore_index=True)
+    return table
@@ -0,0 +1,147 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Forecast settings used by analyze_data
+FORECAST_CONFIG = {
+    'monthly_horizon': 6,      # Months to forecast ahead
+    'daily_horizon': 28,       # Days to forecast ahead
+    'top_products': 100,       # Number of top products (by revenue) that get their own forecast
+    'alphas': np.linspace(0.05, 0.95, 19),  # Smoothing levels tried for exponential smoothing
+}
+
+def build_series_matrix(keys, periods, values, n_periods):
+    """Scatter-add values into a dense (series x periods) matrix in one pass"""
+    codes, labels = pd.factorize(keys)
+    valid = codes >= 0
+    flat = codes[valid].astype(np.int64) * n_periods + periods[valid]
+    matrix = np.bincount(flat, weights=values[valid], minlength=len(labels) * n_periods)
+    return matrix.reshape(len(labels), n_periods), np.asarray(labels)
+
+def seasonal_naive(Y, season, horizon):
+    """Seasonal naive forecast for every row of Y at once
+
+    Returns the forecasts (series x horizon) and the in-sample mean absolute error
+    of the one-season-back prediction. Series shorter than one season fall back
+    to the plain naive (last value) forecast.
+    """
+    n_series, n_periods = Y.shape
+    if n_periods <= season:
+        season = 1
+    steps = np.arange(horizon)
+    forecast = Y[:, n_periods - season + (steps % season)]
+    if n_periods < 2:
+        return forecast, np.zeros(n_series)
+    mae = np.abs(Y[:, season:] - Y[:, :-season]).mean(axis=1)
+    return forecast, mae
+
+def exponential_smoothing(Y, alphas, horizon):
+    """Simple exponential smoothing fitted for all series and all alphas together
+
+    The recursion runs over time only; each step updates a (series x alphas)
+    array, so the cost does not grow with a Python loop over series. The alpha
+    with the lowest one-step-ahead absolute error is kept per series.
+    """
+    n_series, n_periods = Y.shape
+    level = np.repeat(Y[:, :1], len(alphas), axis=1)
+    abs_error = np.zeros_like(level)
+    for t in range(1, n_periods):
+        error = Y[:, t:t + 1] - level
+        abs_error += np.abs(error)
+        level += alphas * error
+    mae = abs_error / max(n_periods - 1, 1)
+    best = mae.argmin(axis=1)
+    rows = np.arange(n_series)
+    forecast = np.repeat(level[rows, best][:, None], horizon, axis=1)
+    return forecast, mae[rows, best], alphas[best]
+
+def fit_best_model(Y, season, horizon, alphas):
+    """Fit both models and keep the one with the lower in-sample error per series"""
+    sn_forecast, sn_mae = seasonal_naive(Y, season, horizon)
+    es_forecast, es_mae, es_alpha = exponential_smoothing(Y, alphas, horizon)
+    use_seasonal = sn_mae <= es_mae
+    forecast = np.where(use_seasonal[:, None], sn_forecast, es_forecast)
+    model = np.where(use_seasonal, 'seasonal_naive', 'exp_smoothing')
+    alpha = np.where(use_seasonal, np.nan, es_alpha)
+    mae = np.where(use_seasonal, sn_mae, es_mae)
+    return forecast, model, alpha, mae
+
+def forecast_frame(frequency, level, labels, forecast, model, alpha, mae, period_labels):
+    """Lay out forecasts (series x horizon) as a long table"""
+    n_series, horizon = forecast.shape
+    return pd.DataFrame({
+        'frequency': frequency,
+        'level': level,
+        'series': np.repeat(labels, horizon),
+        'model': np.repeat(model, horizon),
+        'alpha': np.repeat(alpha, horizon),
+        'mae': np.repeat(mae, horizon),
+        'period': np.tile(period_labels, n_series),
+        'forecast': forecast.ravel(),
+    })
+
+def forecast_sales(df, reports_dir, config=FORECAST_CONFIG):
+    """Forecast monthly and daily sales for the total, each country and the top products"""
+    print("\n=== Sales Forecasting ===")
+
+    if not all(col in df.columns for col in ['invoicedate', 'totalprice']):
+        print("InvoiceDate or TotalPrice column not found, skipping forecasts")
+        return None
+
+    start_time = time.time()
+    valid = df['invoicedate'].notna() & df['totalprice'].notna()
+    dates = df.loc[valid, 'invoicedate']
+    values = df.loc[valid, 'totalprice'].to_numpy(dtype=float)
+    if len(values) == 0:
+        print("No dated sales to forecast")
+        return None
+
+    # Integer period indices shared by every series
+    month_index = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+    first_month = month_index.min()
+    month_index = month_index - first_month
+    n_months = month_index.max() + 1
+
+    day = dates.dt.normalize()
+    first_day = day.min()
+    day_index = (day - first_day).dt.days.to_numpy()
+    n_days = day_index.max() + 1
+
+    month_labels = pd.period_range(pd.Period(year=first_month // 12, month=first_month % 12 + 1, freq='M'),
+                                   periods=n_months + config['monthly_horizon'], freq='M').astype(str)
+    day_labels = pd.date_range(first_day, periods=n_days + config['daily_horizon'], freq='D').strftime('%Y-%m-%d')
+
+    # Series to forecast: total, every country and the top products by revenue
+    levels = [('total', np.zeros(len(values), dtype=np.int8))]
+    if 'country' in df.columns:
+        levels.append(('country', df.loc[valid, 'country'].to_numpy()))
+    if 'description' in df.columns:
+        descriptions = df.loc[valid, 'description']
+        revenue = pd.Series(values, index=descriptions.index).groupby(descriptions, observed=True).sum()
+        top = revenue.nlargest(config['top_products']).index
+        levels.append(('product', descriptions.where(descriptions.isin(top)).to_numpy()))
+
+    frames = []
+    n_series = 0
+    for level, keys in levels:
+        for frequency, periods, n_periods, season, horizon, labels in [
+            ('monthly', month_index, n_months, 12, config['monthly_horizon'], month_labels),
+            ('daily', day_index, n_days, 7, config['daily_horizon'], day_labels),
+        ]:
+            Y, series_labels = build_series_matrix(keys, periods, values, n_periods)
+            if level == 'total':
+                series_labels = np.array(['All'])
+            forecast, model, alpha, mae = fit_best_model(Y, season, horizon, config['alphas'])
+            frames.append(forecast_frame(frequency, level, series_labels, forecast, model, alpha, mae,
+                                         np.asarray(labels[n_periods:])))
+            n_series += len(series_labels)
+
+    forecasts = pd.concat(frames, ignore_index=True)
+
+    forecasts_file = os.path.join(reports_dir, "forecasts.csv")
+    forecasts.to_csv(forecasts_file, index=False)
+    print(f"Fitted forecasts for {n_series:,} series in {time.time() - start_time:.2f} seconds")
+    print(f"Saved sales forecasts to {forecasts_file}")
+
+    return forecasts
@@ -0,0 +1,203 @@
+import os
+import gc
+import re
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Live copies of a chunk while it is cleaned: the raw rows, clean_dataset's copy,
+# the filtered frame and the derived columns
+WORKING_COPIES = 4
+# Fraction of the budget in use above which cleaned frames are spilled to disk
+SPILL_THRESHOLD = 0.7
+# Rough footprint of one worker process with pandas and numpy imported
+WORKER_OVERHEAD = 150 * 1024 * 1024
+MIN_CHUNK_ROWS = 10_000
+
+SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+              'G': 1024 ** 3, 'GB': 1024 ** 3, 'T': 1024 ** 4, 'TB': 1024 ** 4}
+
+def parse_size(text):
+    """Parse a size such as '4GB', '512M' or '1000000' into bytes"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([A-Za-z]*)\s*", str(text))
+    if not match or match.group(2).upper() not in SIZE_UNITS:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+def format_size(n_bytes):
+    return f"{n_bytes / 1024 ** 2:,.0f} MB"
+
+def available_memory():
+    """Memory this process may use: the container limit if there is one, else the free RAM"""
+    limits = []
+    for path in ["/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"]:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value.isdigit() and int(value) < 1 << 60:
+                limits.append(int(value))
+        except OSError:
+            continue
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    limits.append(int(line.split()[1]) * 1024)
+    except OSError:
+        pass
+    return min(limits) if limits else None
+
+def current_rss():
+    """Resident memory of this process in bytes (None where it cannot be read)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def peak_rss(who='self'):
+    """Peak resident memory of this process, or of its largest finished child process"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss * (1 if os.uname().sysname == 'Darwin' else 1024)
+
+class SpilledFrame:
+    """A frame written to disk with one pickle per column, so it can be merged a column at a time"""
+
+    def __init__(self, df, spill_dir):
+        self.path = tempfile.mkdtemp(prefix="frame_", dir=spill_dir)
+        self.columns = list(df.columns)
+        self.length = len(df)
+        self.nbytes = 0
+        for i, column in enumerate(self.columns):
+            column_file = os.path.join(self.path, f"{i}.pkl")
+            with open(column_file, 'wb') as f:
+                pickle.dump(df[column].reset_index(drop=True), f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.nbytes += os.path.getsize(column_file)
+
+    def __len__(self):
+        return self.length
+
+    def pop(self, column):
+        """Load one column and delete its file"""
+        column_file = os.path.join(self.path, f"{self.columns.index(column)}.pkl")
+        with open(column_file, 'rb') as f:
+            values = pickle.load(f)
+        os.remove(column_file)
+        return values
+
+def pop_column(frame, column, fill=None):
+    """Take one column out of an in-memory or spilled frame, so it is freed there once merged
+
+    A frame without the column gives a column of `fill` values instead.
+    """
+    if column not in frame.columns:
+        return pd.Series(np.full(len(frame), fill, dtype=object if fill is None else np.int64))
+    if isinstance(frame, SpilledFrame):
+        return frame.pop(column)
+    values = frame[column]
+    del frame[column]
+    return values
+
+class MemoryGovernor:
+    """Keep the pipeline within a memory budget
+
+    Estimates the in-memory size of a row from a sample of each raw file and
+    derives chunk sizes, batch sizes and worker counts from the headroom left
+    in the budget. Cleaned frames are spilled to disk when usage nears the budget
+    and the peak is reported against it at the end of the run.
+    """
+
+    def __init__(self, budget=None, spill_dir=None):
+        if budget is None:
+            available = available_memory()
+            budget = int(available * 0.75) if available else 4 * 1024 ** 3
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self.spilled_bytes = 0
+        self.peak = current_rss() or 0
+
+    def sample(self):
+        """Current usage, also tracked as the observed peak"""
+        rss = current_rss()
+        if rss is not None:
+            self.peak = max(self.peak, rss)
+        return rss or 0
+
+    def headroom(self):
+        """Bytes of the budget still free (never less than a tenth of it)"""
+        return max(self.budget - self.sample(), self.budget // 10)
+
+    def estimate_rows(self, file_info, sample_rows=10_000):
+        """Estimated in-memory bytes per row and number of rows of a raw file, from a sample"""
+        if file_info["type"] == "xlsx":
+            sample = pd.read_excel(file_info["path"], nrows=sample_rows)
+            n_rows = None
+        else:
+            sample = pd.read_csv(file_info["path"], encoding='latin1', on_bad_lines='skip', nrows=sample_rows)
+            # Scale the row count by the bytes per line of the sampled lines
+            with open(file_info["path"], 'rb') as f:
+                sample_bytes = sum(len(f.readline()) for _ in range(len(sample) + 1))
+            file_size = os.path.getsize(file_info["path"])
+            n_rows = int(file_size / sample_bytes * len(sample)) if sample_bytes else 0
+        row_bytes = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+        return row_bytes, n_rows
+
+    def chunk_rows(self, row_bytes, copies=WORKING_COPIES):
+        """Rows that can be processed at once with `copies` live copies of each row"""
+        return max(int(self.headroom() / (row_bytes * copies)), MIN_CHUNK_ROWS)
+
+    def workers(self, requested, bytes_per_worker, label="workers"):
+        """Cap a worker count so every worker's share fits in the headroom"""
+        allowed = max(1, min(requested, int(self.headroom() // max(bytes_per_worker, 1))))
+        if allowed < requested:
+            print(f"Memory budget: using {allowed} {label} instead of {requested} "
+                  f"(~{format_size(bytes_per_worker)} each)")
+        return allowed
+
+    def should_spill(self):
+        return self.sample() > self.budget * SPILL_THRESHOLD
+
+    def spill(self, frames):
+        """Write the in-memory frames of a list to disk and keep only their handles in it
+
+        merge_datasets reads spilled frames back one column at a time, so a spill
+        lowers the peak of the merge too.
+        """
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="sales_spill_")
+        for i, df in enumerate(frames):
+            if isinstance(df, pd.DataFrame):
+                frames[i] = SpilledFrame(df, self.spill_dir)
+                self.spilled_bytes += frames[i].nbytes
+        gc.collect()
+
+    def report(self):
+        """Print peak memory usage against the budget and remove spill files"""
+        self.sample()
+        peak = max(self.peak, peak_rss('self') or 0)
+        print(f"Memory budget: {format_size(self.budget)}")
+        print(f"Peak memory (main process): {format_size(peak)} ({peak / self.budget:.0%} of budget)")
+        child_peak = peak_rss('children')
+        if child_peak:
+            print(f"Peak memory (largest worker process): {format_size(child_peak)}")
+        if self.spilled_bytes:
+            print(f"Spilled {format_size(self.spilled_bytes)} of cleaned data to disk")
+        if peak > self.budget:
+            print("Warning: peak usage exceeded the memory budget")
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+        return peak
@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# Heatmap settings used by analyze_data
+HEATMAP_CONFIG = {
+    'top_products': 20,   # Products shown in the product x month grid
+}
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+def build_grids(axes, values):
+    """Aggregate several 2-D grids with a single scatter-add
+
+    `axes` maps a grid name to (row_codes, n_rows, col_codes, n_cols). Every grid
+    gets its own block of a flat index space, rows with a negative code are
+    dropped, and one np.bincount fills all blocks at once.
+    """
+    flat_indices = []
+    flat_values = []
+    offsets = {}
+    offset = 0
+    for name, (row_codes, n_rows, col_codes, n_cols) in axes.items():
+        valid = (row_codes >= 0) & (col_codes >= 0)
+        flat_indices.append(offset + row_codes[valid].astype(np.int64) * n_cols + col_codes[valid])
+        flat_values.append(values[valid])
+        offsets[name] = (offset, n_rows, n_cols)
+        offset += n_rows * n_cols
+
+    totals = np.bincount(np.concatenate(flat_indices), weights=np.concatenate(flat_values), minlength=offset)
+
+    grids = {}
+    for name, (start, n_rows, n_cols) in offsets.items():
+        grids[name] = totals[start:start + n_rows * n_cols].reshape(n_rows, n_cols)
+    return grids
+
+def plot_heatmap(grid, title, chart_file, figsize, annot=False):
+    plt.figure(figsize=figsize)
+    sns.heatmap(grid, cmap='YlOrRd', annot=annot, fmt=',.0f', linewidths=0.5)
+    plt.title(title, fontsize=16)
+    plt.xlabel(grid.columns.name, fontsize=12)
+    plt.ylabel(grid.index.name, fontsize=12)
+    plt.tight_layout()
+    plt.savefig(chart_file)
+    plt.close()
+
+def analyze_heatmaps(df, reports_dir, viz_dir, config=HEATMAP_CONFIG):
+    """Build hour x weekday, country x month and product x month sales grids"""
+    print("\n=== Heatmap Analysis ===")
+
+    if not all(col in df.columns for col in ['invoicedate', 'totalprice']):
+        print("InvoiceDate or TotalPrice column not found, skipping heatmaps")
+        return None
+
+    valid = df['invoicedate'].notna() & df['totalprice'].notna()
+    dates = df.loc[valid, 'invoicedate']
+    values = df.loc[valid, 'totalprice'].to_numpy(dtype=float)
+    if len(values) == 0:
+        print("No dated sales for heatmaps")
+        return None
+
+    # Integer-coded axes
+    hour_codes = dates.dt.hour.to_numpy()
+    weekday_codes = dates.dt.dayofweek.to_numpy()
+    month_index = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+    first_month = month_index.min()
+    month_codes = month_index - first_month
+    n_months = month_codes.max() + 1
+    month_labels = pd.period_range(pd.Period(year=first_month // 12, month=first_month % 12 + 1, freq='M'),
+                                   periods=n_months, freq='M').astype(str)
+
+    axes = {'hour_weekday': (hour_codes, 24, weekday_codes, 7)}
+    labels = {'hour_weekday': (pd.Index(range(24), name='hour'), pd.Index(DAY_NAMES, name='weekday'))}
+
+    if 'country' in df.columns:
+        country_codes, countries = pd.factorize(df.loc[valid, 'country'], sort=True)
+        axes['country_month'] = (country_codes, len(countries), month_codes, n_months)
+        labels['country_month'] = (pd.Index(countries, name='country'), pd.Index(month_labels, name='month'))
+
+    if 'description' in df.columns:
+        product_codes, products = pd.factorize(df.loc[valid, 'description'])
+        axes['product_month'] = (product_codes, len(products), month_codes, n_months)
+        labels['product_month'] = (pd.Index(products, name='product'), pd.Index(month_labels, name='month'))
+
+    grids = {}
+    for name, grid in build_grids(axes, values).items():
+        index, columns = labels[name]
+        grids[name] = pd.DataFrame(grid, index=index, columns=columns)
+
+    # Countries ordered by total sales
+    if 'country_month' in grids:
+        grid = grids['country_month']
+        grids['country_month'] = grid.loc[grid.sum(axis=1).sort_values(ascending=False).index]
+
+    # Keep only the top products, picked from the row totals of the same grid
+    if 'product_month' in grids:
+        grid = grids['product_month']
+        top_n = min(config['top_products'], len(grid))
+        row_totals = grid.sum(axis=1).to_numpy()
+        top_rows = np.argpartition(-row_totals, top_n - 1)[:top_n]
+        top_rows = top_rows[np.argsort(-row_totals[top_rows])]
+        grids['product_month'] = grid.iloc[top_rows]
+
+    charts = {
+        'hour_weekday': ('Sales by Hour and Day of Week', (10, 10), True),
+        'country_month': ('Sales by Country and Month', (16, 12), False),
+        'product_month': (f"Top {config['top_products']} Products by Month", (16, 10), False),
+    }
+
+    for name, grid in grids.items():
+        grid_file = os.path.join(reports_dir, f"heatmap_{name}.csv")
+        grid.to_csv(grid_file)
+        print(f"Saved {name.replace('_', ' x ')} grid to {grid_file}")
+
+        title, figsize, annot = charts[name]
+        chart_file = os.path.join(viz_dir, f"heatmap_{name}.png")
+        plot_heatmap(grid, title, chart_file, figsize, annot)
+        print(f"Saved {name.replace('_', ' x ')} heatmap to {chart_file}")
+
+    return grids
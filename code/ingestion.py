@@ -0,0 +1,159 @@
+import os
+import glob
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Raw files the sequential pipeline reads (concurrent ingestion reads every CSV/XLSX)
+DATASET_PATTERNS = ["*retail*.csv", "*retail*.xlsx", "*commerce*.csv"]
+
+# Raw names of the invoice date column (see the column mappings in clean_dataset)
+DATE_COLUMNS = ['invoicedate', 'invoice date', 'invoice_date', 'order date', 'order_date']
+
+def find_raw_files(raw_data_dir, all_files=True):
+    """Find the raw CSV/XLSX files to ingest
+
+    By default every file under the raw data directory; with all_files=False only
+    the retail and e-commerce files of the top level, as the sequential pipeline
+    reads them. main.py and the watcher both discover files here.
+    """
+    if all_files:
+        paths = []
+        for root, _, names in os.walk(raw_data_dir):
+            paths += [os.path.join(root, name) for name in sorted(names)
+                      if name.endswith(".csv") or name.endswith(".xlsx")]
+    else:
+        paths = []
+        for pattern in DATASET_PATTERNS:
+            paths += [path for path in glob.glob(os.path.join(raw_data_dir, pattern)) if path not in paths]
+
+    files = []
+    for path in paths:
+        name = os.path.basename(path)
+        files.append({
+            "path": path,
+            "name": name,
+            "type": "xlsx" if name.endswith(".xlsx") else "csv",
+            "size": os.path.getsize(path),
+        })
+    return files
+
+def read_raw_file(file_info):
+    """Read one raw file and time it"""
+    start_time = time.perf_counter()
+    try:
+        if file_info["type"] == "xlsx":
+            df = pd.read_excel(file_info["path"])
+        else:
+            df = pd.read_csv(file_info["path"], encoding='latin1', on_bad_lines='skip')
+        # Keep track of the original file once it is coalesced with others
+        df['data_source'] = file_info["name"]
+    except Exception as e:
+        print(f"Error reading {file_info['name']}: {e}")
+        df = None
+    return df, time.perf_counter() - start_time
+
+def read_files_concurrently(files, max_workers):
+    """Read files with a bounded thread pool, returning results in input order"""
+    results = [None] * len(files)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(read_raw_file, file_info): i for i, file_info in enumerate(files)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+def date_format(df):
+    """Format pandas infers for a frame's invoice dates, from the first non-missing value"""
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            dates = df[column].dropna()
+            if len(dates) and isinstance(dates.iloc[0], str):
+                return guess_datetime_format(dates.iloc[0])
+            return None
+    return None
+
+def coalesce_batches(frames, batch_rows):
+    """Group frames with the same columns and date format into batches of roughly batch_rows rows
+
+    clean_dataset parses a batch's dates with the format inferred from its first
+    row, so files whose dates are written differently are never batched together.
+    """
+    by_schema = {}
+    for df in frames:
+        # Normalize the names the way clean_dataset does, so headers that only differ
+        # in case or spacing line up instead of becoming separate columns in pd.concat
+        df.columns = [str(col).lower().strip() for col in df.columns]
+        by_schema.setdefault((tuple(df.columns), date_format(df)), []).append(df)
+
+    batches = []
+    for schema_frames in by_schema.values():
+        current = []
+        current_rows = 0
+        for df in schema_frames:
+            current.append(df)
+            current_rows += len(df)
+            if current_rows >= batch_rows:
+                batches.append(current)
+                current = []
+                current_rows = 0
+        if current:
+            batches.append(current)
+
+    return [pd.concat(batch, ignore_index=True) if len(batch) > 1 else batch[0] for batch in batches]
+
+def ingest_concurrently(raw_data_dir, clean, max_workers=8, batch_rows=500_000, governor=None):
+    """Read all raw files concurrently, coalesce small ones and clean them in batches
+
+    `clean` is the cleaning function, called as clean(df, dataset_name) once per batch
+    and returning the cleaned sales and the cancellations/returns partition. With a
+    MemoryGovernor, the reader threads and batch size are capped to its budget.
+    """
+    print("\n=== Concurrent Ingestion ===")
+
+    files = find_raw_files(raw_data_dir)
+    if not files:
+        print(f"No data files found in {raw_data_dir}")
+        return [], []
+
+    total_bytes = sum(file_info["size"] for file_info in files)
+
+    if governor is not None:
+        # Size the work from a sample of the largest file
+        largest = max(files, key=lambda file_info: file_info["size"])
+        row_bytes, n_rows = governor.estimate_rows(largest)
+        file_bytes = row_bytes * n_rows if n_rows else largest["size"] * 4
+        max_workers = governor.workers(max_workers, file_bytes * 2, "reader threads")
+        batch_rows = min(batch_rows, governor.chunk_rows(row_bytes))
+    print(f"Reading {len(files)} files ({total_bytes / 1e6:,.1f} MB) with {max_workers} workers")
+
+    start_time = time.perf_counter()
+    results = read_files_concurrently(files, max_workers)
+    read_time = time.perf_counter() - start_time
+
+    frames = [df for df, _ in results if df is not None]
+    latencies = np.array([seconds for _, seconds in results])
+    total_rows = sum(len(df) for df in frames)
+
+    print(f"Read {len(frames)}/{len(files)} files, {total_rows:,} rows in {read_time:.2f} seconds")
+    print(f"Throughput: {len(files) / read_time:,.1f} files/s, "
+          f"{total_bytes / 1e6 / read_time:,.1f} MB/s, {total_rows / read_time:,.0f} rows/s")
+    print(f"Per-file latency: min {latencies.min() * 1000:.1f} ms, "
+          f"median {np.median(latencies) * 1000:.1f} ms, "
+          f"p95 {np.percentile(latencies, 95) * 1000:.1f} ms, "
+          f"max {latencies.max() * 1000:.1f} ms")
+
+    batches = coalesce_batches(frames, batch_rows)
+    del frames
+    print(f"Coalesced into {len(batches)} batches for cleaning")
+
+    cleaned_dfs = []
+    returns_dfs = []
+    for i, batch in enumerate(batches):
+        df_clean, df_returns = clean(batch, f"batch_{i:03d}")
+        cleaned_dfs.append(df_clean)
+        returns_dfs.append(df_returns)
+
+    return cleaned_dfs, returns_dfs
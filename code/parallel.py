@@ -0,0 +1,229 @@
+import os
+import time
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+# Merged-data columns stored as integer codes for the workers
+CODED_COLUMNS = ['invoiceno', 'customerid', 'description', 'country']
+
+NAT = np.iinfo(np.int64).min
+
+def pad_add(a, b):
+    """Add two count/sum vectors of possibly different lengths"""
+    if len(a) < len(b):
+        a, b = b, a
+    result = a.copy()
+    result[:len(b)] += b
+    return result
+
+def partial_aggregates(data_dir, start, end, n_labels):
+    """Map step: partial aggregates for rows [start, end) of the memory-mapped columns
+
+    Runs in a worker process. Only the paths and the row range are pickled; the
+    column arrays are opened with mmap so every worker reads the same pages.
+    """
+    values = np.load(os.path.join(data_dir, "totalprice.npy"), mmap_mode='r')[start:end]
+    dates = np.load(os.path.join(data_dir, "invoicedate.npy"), mmap_mode='r')[start:end]
+
+    has_value = ~np.isnan(values)
+    amounts = np.where(has_value, values, 0.0)
+    partial = {
+        'rows': end - start,
+        'total_sales': amounts.sum(),
+    }
+
+    # Distinct-count state: one bitmap per coded column, merged with OR
+    for column, n in n_labels.items():
+        codes = np.load(os.path.join(data_dir, f"{column}.npy"), mmap_mode='r')[start:end]
+        seen = np.zeros(n, dtype=bool)
+        seen[codes[codes >= 0]] = True
+        partial[f'seen_{column}'] = seen
+        if column in ('description', 'country'):
+            valid = codes >= 0
+            partial[f'sales_{column}'] = np.bincount(codes[valid], weights=amounts[valid], minlength=n)
+
+    # Date aggregates, computed from nanoseconds since the epoch
+    dated = dates != NAT
+    partial['min_date'] = dates[dated].min() if dated.any() else None
+    partial['max_date'] = dates[dated].max() if dated.any() else None
+    datetimes = dates[dated].view('M8[ns]')
+    months = datetimes.astype('M8[M]').astype(np.int64)     # Months since 1970-01
+    days = datetimes.astype('M8[D]').astype(np.int64)       # Days since 1970-01-01 (a Thursday)
+    dayofweek = (days + 3) % 7                              # Monday = 0
+    partial['month_sales'] = np.bincount(months, weights=amounts[dated])
+    partial['month_rows'] = np.bincount(months)
+    partial['day_sales'] = np.bincount(dayofweek, weights=amounts[dated], minlength=7)
+    partial['day_rows'] = np.bincount(dayofweek, minlength=7)
+    return partial
+
+def combine(a, b):
+    """Reduce step: associative merge of two partial aggregates"""
+    merged = {}
+    for key in a:
+        if key.startswith('seen_'):
+            merged[key] = a[key] | b[key]
+        elif key == 'min_date':
+            merged[key] = min((d for d in (a[key], b[key]) if d is not None), default=None)
+        elif key == 'max_date':
+            merged[key] = max((d for d in (a[key], b[key]) if d is not None), default=None)
+        elif isinstance(a[key], np.ndarray):
+            merged[key] = pad_add(a[key], b[key])
+        else:
+            merged[key] = a[key] + b[key]
+    return merged
+
+class PartitionedAggregator:
+    """Compute the core report aggregates with map-reduce over partitions of the merged data
+
+    The merged frame is split by source file or by month. String columns are
+    integer-coded and every column is written once as a memory-mapped .npy file,
+    so worker processes share the data instead of receiving pickled frames. Each
+    worker returns small partial aggregates (sums, row counts, distinct bitmaps,
+    min/max dates) that are merged associatively. The work runs on first use.
+    """
+
+    def __init__(self, df, workers, partition_by='source'):
+        self.df = df
+        self.workers = workers
+        self.partition_by = partition_by
+        self._result = None
+
+    def partitions(self, df):
+        """Row ranges of the runs of equal partition key, in the frame's existing order
+
+        The merged frame is concatenated file by file, so sources are already
+        contiguous, and months are as long as the files are in date order. The
+        aggregates are associative, so the rows are never reordered: a key that
+        comes back later in the frame just starts another range.
+        """
+        if self.partition_by == 'month' and 'invoicedate' in df.columns:
+            key = df['invoicedate'].to_numpy(dtype='M8[ns]').astype('M8[M]').view(np.int64)
+        elif 'data_source' in df.columns:
+            key = df['data_source'].to_numpy()
+        else:
+            return 1, [(0, len(df))]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        ends = np.r_[starts[1:], len(key)]
+        return len(pd.unique(key[starts])), list(zip(starts.tolist(), ends.tolist()))
+
+    def chunks(self, ranges, n_rows):
+        """Row chunks of at most an even share of the work per worker, cut at range boundaries
+
+        Large ranges are split and consecutive small ones are packed together, so
+        interleaved partition keys do not turn into a flood of tiny tasks. Any split
+        combines to the same result.
+        """
+        chunk_rows = max(-(-n_rows // (self.workers * 2)), 1)
+        chunks = []
+        chunk_start = 0
+        for start, end in ranges:
+            if end - chunk_start > chunk_rows and start > chunk_start:
+                chunks.append((chunk_start, start))
+                chunk_start = start
+            while end - chunk_start > chunk_rows:
+                chunks.append((chunk_start, chunk_start + chunk_rows))
+                chunk_start += chunk_rows
+        if n_rows > chunk_start:
+            chunks.append((chunk_start, n_rows))
+        return chunks
+
+    def write_columns(self, df, data_dir):
+        """Write the columns the workers need as .npy files, in the frame's row order"""
+        labels = {}
+        values = df['totalprice'].to_numpy(dtype=float) if 'totalprice' in df.columns else np.zeros(len(df))
+        np.save(os.path.join(data_dir, "totalprice.npy"), values)
+
+        if 'invoicedate' in df.columns and pd.api.types.is_datetime64_dtype(df['invoicedate']):
+            dates = df['invoicedate'].to_numpy(dtype='M8[ns]').view(np.int64)
+        else:
+            dates = np.full(len(df), NAT, dtype=np.int64)
+        np.save(os.path.join(data_dir, "invoicedate.npy"), dates)
+
+        for column in CODED_COLUMNS:
+            if column not in df.columns:
+                continue
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                # Dimension IDs are already integers, no need to factorize the labels
+                codes, labels[column] = df[column].cat.codes.to_numpy(), df[column].cat.categories
+            else:
+                codes, labels[column] = pd.factorize(df[column])
+            np.save(os.path.join(data_dir, f"{column}.npy"), codes)
+        return labels
+
+    def result(self):
+        if self._result is None:
+            self._result = self.run()
+        return self._result
+
+    def run(self):
+        print(f"\n=== Partitioned Aggregation ({self.workers} workers, by {self.partition_by}) ===")
+        start_time = time.time()
+        df = self.df
+
+        n_partitions, ranges = self.partitions(df)
+        data_dir = tempfile.mkdtemp(prefix="sales_partitions_")
+        try:
+            labels = self.write_columns(df, data_dir)
+            n_labels = {column: len(labels[column]) for column in labels}
+            chunks = self.chunks(ranges, len(df))
+            print(f"Split {len(df):,} rows into {n_partitions} partitions ({len(chunks)} chunks)")
+
+            merged = None
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                # as_completed keeps the only references to the futures and drops each one once
+                # it is yielded, so a partial is freed as soon as it is folded into the merged state
+                for future in as_completed([executor.submit(partial_aggregates, data_dir, start, end, n_labels)
+                                            for start, end in chunks]):
+                    partial = future.result()
+                    del future
+                    merged = partial if merged is None else combine(merged, partial)
+                    del partial
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+        print(f"Combined {len(chunks)} partial aggregates in {time.time() - start_time:.2f} seconds")
+        return self.reports(merged, labels)
+
+    def reports(self, merged, labels):
+        """Turn the merged partial aggregates into report tables"""
+        columns = self.df.columns
+        has_dates = 'invoicedate' in columns and pd.api.types.is_datetime64_dtype(self.df['invoicedate'])
+        results = {
+            'total_sales': merged['total_sales'] if 'totalprice' in columns else 'N/A',
+            'num_transactions': int(merged['seen_invoiceno'].sum()) if 'invoiceno' in labels else 'N/A',
+            'num_customers': int(merged['seen_customerid'].sum()) if 'customerid' in labels else 'N/A',
+            'num_products': int(merged['seen_description'].sum()) if 'description' in labels else 'N/A',
+            'num_countries': int(merged['seen_country'].sum()) if 'country' in labels else 'N/A',
+            'date_range': 'N/A',
+        }
+        if has_dates and merged['min_date'] is not None:
+            results['date_range'] = f"{pd.Timestamp(merged['min_date'])} to {pd.Timestamp(merged['max_date'])}"
+
+        if has_dates and 'totalprice' in columns:
+            months = np.flatnonzero(merged['month_rows'])
+            results['monthly_sales'] = pd.DataFrame({
+                'year': (1970 + months // 12).astype(np.int32),
+                'month': (months % 12 + 1).astype(np.int32),
+                'totalprice': merged['month_sales'][months],
+            })
+            days = np.flatnonzero(merged['day_rows'])
+            results['daily_sales'] = pd.DataFrame({
+                'dayofweek': days.astype(np.int32),
+                'totalprice': merged['day_sales'][days],
+            })
+
+        for column, report in [('description', 'product_sales'), ('country', 'country_sales')]:
+            if column in labels and 'totalprice' in columns:
+                # Dictionary labels that do not occur in the data are dropped, and rows are
+                # put in label order like the serial groupby
+                seen = merged[f'seen_{column}']
+                table = pd.DataFrame({
+                    column: np.asarray(labels[column], dtype=object)[seen],
+                    'totalprice': merged[f'sales_{column}'][seen],
+                })
+                results[report] = table.sort_values(column, kind='stable', ignore_index=True)
+        return results
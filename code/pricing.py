@@ -0,0 +1,201 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from ranking import MAX_DENSE_CELLS
+
+# Price analytics settings used by analyze_data
+PRICING_CONFIG = {
+    'period_days': 7,            # Length of the periods prices and quantities are compared over
+    'min_price_change': 0.02,    # Relative change in the average price that counts as a price change
+    'min_periods': 4,            # Periods with sales an SKU needs for an elasticity estimate
+}
+
+def segments(sorted_keys):
+    """Start and length of every run of equal keys in a sorted array"""
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return starts, np.diff(np.r_[starts, len(sorted_keys)])
+
+def segment_quantile(sorted_values, starts, counts, q):
+    """Quantile q of every segment of values sorted within segments (linear interpolation)"""
+    position = q * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    lower = sorted_values[starts + low]
+    return lower + (sorted_values[starts + high] - lower) * (position - low)
+
+def price_statistics(sku, price, quantity, revenue, n_skus):
+    """Per-SKU price distribution from one lexsort of the rows by (SKU, price)
+
+    `sku` holds dense codes 0..n_skus-1, so segment i of the sorted rows is SKU i.
+    """
+    order = np.lexsort((price, sku))
+    sorted_sku = sku[order]
+    sorted_price = price[order]
+    starts, counts = segments(sorted_sku)
+
+    lines = np.bincount(sku, minlength=n_skus)
+    total_quantity = np.bincount(sku, weights=quantity, minlength=n_skus)
+    total_revenue = np.bincount(sku, weights=revenue, minlength=n_skus)
+    mean_price = np.bincount(sku, weights=price, minlength=n_skus) / lines
+    squares = np.bincount(sku, weights=(price - mean_price[sku]) ** 2, minlength=n_skus)
+
+    # A new distinct price starts wherever the sorted price changes inside a segment
+    new_price = np.r_[True, (sorted_price[1:] != sorted_price[:-1]) | (sorted_sku[1:] != sorted_sku[:-1])]
+    distinct_prices = np.add.reduceat(new_price, starts)
+
+    stats = pd.DataFrame({
+        'sku': np.arange(n_skus),
+        'lines': lines,
+        'quantity': total_quantity,
+        'revenue': total_revenue,
+        'revenue_share': total_revenue / total_revenue.sum(),
+        'min_price': sorted_price[starts],
+        'p25_price': segment_quantile(sorted_price, starts, counts, 0.25),
+        'median_price': segment_quantile(sorted_price, starts, counts, 0.5),
+        'p75_price': segment_quantile(sorted_price, starts, counts, 0.75),
+        'max_price': sorted_price[starts + counts - 1],
+        'mean_price': mean_price,
+        'weighted_price': total_revenue / total_quantity,
+        'price_std': np.sqrt(squares / np.where(lines > 1, lines - 1, np.nan)),
+        'distinct_prices': distinct_prices,
+    })
+    return stats
+
+def period_series(sku, period, quantity, revenue, n_skus):
+    """Quantity and revenue per (SKU, period) that has sales, sorted by SKU then period"""
+    n_periods = int(period.max()) + 1
+    flat = sku.astype(np.int64) * n_periods + period
+    if n_skus * n_periods <= MAX_DENSE_CELLS:
+        # Dense SKU x period grid: the occupied cells come out already sorted
+        lines = np.bincount(flat, minlength=n_skus * n_periods)
+        pairs = np.flatnonzero(lines)
+        quantities = np.bincount(flat, weights=quantity, minlength=n_skus * n_periods)[pairs]
+        revenues = np.bincount(flat, weights=revenue, minlength=n_skus * n_periods)[pairs]
+    else:
+        pairs, inverse = np.unique(flat, return_inverse=True)
+        quantities = np.bincount(inverse, weights=quantity)
+        revenues = np.bincount(inverse, weights=revenue)
+    series = pd.DataFrame({
+        'sku': pairs // n_periods,
+        'period': pairs % n_periods,
+        'quantity': quantities,
+        'revenue': revenues,
+    })
+    series['price'] = series['revenue'] / series['quantity']
+    return series
+
+def price_response(series, n_skus, config):
+    """Price changes and a log-log elasticity per SKU, as segmented sums over the period series
+
+    The elasticity is the least squares slope of log(quantity) on log(price) over
+    an SKU's periods, from per-SKU sums of x, y, x*x, x*y and y*y.
+    """
+    sku = series['sku'].to_numpy()
+    x = np.log(series['price'].to_numpy())
+    y = np.log(series['quantity'].to_numpy())
+
+    # Price changes between consecutive periods of the same SKU
+    same_sku = np.r_[False, sku[1:] == sku[:-1]]
+    step = np.r_[0.0, np.diff(x)]
+    changed = same_sku & (np.abs(np.expm1(step)) >= config['min_price_change'])
+    changes = np.bincount(sku[changed], minlength=n_skus)
+    increases = np.bincount(sku[changed & (step > 0)], minlength=n_skus)
+    last_change = np.full(n_skus, -1, dtype=np.int64)
+    np.maximum.at(last_change, sku[changed], series['period'].to_numpy()[changed])
+
+    n = np.bincount(sku, minlength=n_skus).astype(float)
+    sx = np.bincount(sku, weights=x, minlength=n_skus)
+    sy = np.bincount(sku, weights=y, minlength=n_skus)
+    sxx = np.bincount(sku, weights=x * x, minlength=n_skus)
+    sxy = np.bincount(sku, weights=x * y, minlength=n_skus)
+    syy = np.bincount(sku, weights=y * y, minlength=n_skus)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var_x = n * sxx - sx ** 2
+        var_y = n * syy - sy ** 2
+        cov = n * sxy - sx * sy
+        # Rounding can leave a tiny variance for SKUs that never changed price
+        estimable = (n >= config['min_periods']) & (var_x > 1e-9 * np.maximum(n * sxx, 1e-12))
+        elasticity = np.where(estimable, cov / var_x, np.nan)
+        r_squared = np.where(estimable & (var_y > 0), cov ** 2 / (var_x * var_y), np.nan)
+
+    return pd.DataFrame({
+        'periods': n.astype(np.int64),
+        'price_changes': changes,
+        'price_increases': increases,
+        'last_change_period': last_change,
+        'elasticity': elasticity,
+        'r_squared': r_squared,
+    })
+
+def analyze_pricing(df, reports_dir, viz_dir, config=PRICING_CONFIG):
+    """Per-SKU price distribution, price changes and price elasticity for all SKUs at once"""
+    print("\n=== Price Analytics ===")
+
+    required = ['stockcode', 'unitprice', 'quantity', 'invoicedate']
+    if not all(col in df.columns for col in required) or not pd.api.types.is_datetime64_dtype(df['invoicedate']):
+        print(f"Columns {required} not found, skipping price analytics")
+        return None
+
+    valid = (df['stockcode'].notna() & df['invoicedate'].notna()
+             & (df['unitprice'] > 0) & (df['quantity'] > 0)).to_numpy()
+    sku, skus = pd.factorize(df.loc[valid, 'stockcode'])
+    n_skus = len(skus)
+    if n_skus == 0:
+        print("No priced sales lines, skipping price analytics")
+        return None
+
+    price = df.loc[valid, 'unitprice'].to_numpy(dtype=float)
+    quantity = df.loc[valid, 'quantity'].to_numpy(dtype=float)
+    revenue = price * quantity
+    days = df.loc[valid, 'invoicedate'].to_numpy(dtype='M8[ns]').astype('M8[D]').astype(np.int64)
+    first_day = days.min()
+    period = (days - first_day) // config['period_days']
+
+    stats = price_statistics(sku, price, quantity, revenue, n_skus)
+    series = period_series(sku, period, quantity, revenue, n_skus)
+    stats = pd.concat([stats, price_response(series, n_skus, config)], axis=1)
+
+    # Labels: the SKU and the first description seen for it
+    stats.insert(0, 'stockcode', np.asarray(skus))
+    if 'description' in df.columns:
+        _, first_row = np.unique(sku, return_index=True)
+        stats.insert(1, 'description', np.asarray(df.loc[valid, 'description'])[first_row])
+    offset = pd.to_timedelta(stats['last_change_period'] * config['period_days'], unit='D')
+    period_start = pd.Timestamp(first_day, unit='D') + offset
+    stats['last_price_change'] = period_start.where(stats['last_change_period'] >= 0).dt.strftime('%Y-%m-%d')
+    stats = stats.drop(columns=['sku', 'last_change_period']).sort_values('revenue', ascending=False, kind='stable')
+
+    stats_file = os.path.join(reports_dir, "price_statistics.csv")
+    stats.to_csv(stats_file, index=False)
+    print(f"Saved price statistics for {len(stats):,} SKUs to {stats_file}")
+
+    estimated = stats[stats['elasticity'].notna()]
+    label_columns = ['stockcode'] + (['description'] if 'description' in stats.columns else [])
+    elasticity = estimated[label_columns + ['revenue', 'periods', 'price_changes', 'weighted_price',
+                                           'elasticity', 'r_squared']]
+    elasticity_file = os.path.join(reports_dir, "price_elasticity.csv")
+    elasticity.to_csv(elasticity_file, index=False)
+    print(f"Saved price elasticity for {len(elasticity):,} SKUs to {elasticity_file}")
+
+    if len(estimated):
+        weighted = np.average(estimated['elasticity'], weights=estimated['revenue'])
+        print(f"SKUs with price changes: {(stats['price_changes'] > 0).sum():,} of {len(stats):,}")
+        print(f"Revenue-weighted elasticity: {weighted:.2f} (median {estimated['elasticity'].median():.2f})")
+
+        plt.figure(figsize=(10, 6))
+        plt.hist(estimated['elasticity'].clip(-10, 10), bins=50, weights=estimated['revenue'])
+        plt.axvline(weighted, color='red', linestyle='--', label=f'Revenue-weighted: {weighted:.2f}')
+        plt.title('Price Elasticity by SKU (revenue-weighted)')
+        plt.xlabel('Elasticity (log quantity / log price)')
+        plt.ylabel('Revenue')
+        plt.legend()
+        plt.tight_layout()
+        chart_file = os.path.join(viz_dir, "price_elasticity.png")
+        plt.savefig(chart_file)
+        plt.close()
+        print(f"Saved price elasticity chart to {chart_file}")
+
+    return stats
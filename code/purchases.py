@@ -0,0 +1,184 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from pricing import segments
+
+# Inter-purchase and session settings used by analyze_data
+PURCHASE_CONFIG = {
+    'session_gap_minutes': 30,   # A purchase more than this long after the previous one starts a new session
+    'churn_days': 90,            # Customers without a purchase in this many days before the last date are churned
+    'interval_bins': [0, 1, 7, 14, 30, 60, 90, 180, 365],        # Lower edges, in days
+    'purchase_bins': [1, 2, 3, 6, 11, 21, 51],                    # Lower edges, in purchases per customer
+    'session_bins': [1, 2, 3, 4, 6, 11],                          # Lower edges, in purchases per session
+}
+
+SECONDS_PER_DAY = 86400
+
+def bin_labels(edges, unit=''):
+    """Labels like '1-7 days' for lower bin edges, the last bin open-ended"""
+    labels = []
+    for low, high in zip(edges, edges[1:] + [None]):
+        if high is None:
+            labels.append(f"{low}+{unit}")
+        elif high - low == 1 and not unit:
+            labels.append(f"{low}")
+        else:
+            labels.append(f"{low}-{high if unit else high - 1}{unit}")
+    return labels
+
+def distribution(values, edges, unit='', **sums):
+    """Counts (and sums of extra arrays) per bin, from one np.digitize and bincount per array"""
+    bins = np.digitize(values, edges) - 1
+    keep = bins >= 0
+    table = pd.DataFrame({'bin': bin_labels(edges, unit)})
+    table['count'] = np.bincount(bins[keep], minlength=len(edges))
+    table['share'] = table['count'] / max(table['count'].sum(), 1)
+    for name, weights in sums.items():
+        table[name] = np.bincount(bins[keep], weights=weights[keep], minlength=len(edges))
+    return table
+
+def purchase_events(df):
+    """Purchases (distinct customer, timestamp) sorted by customer then time, from a single sort
+
+    A line's key packs the customer code into the high 32 bits and the seconds
+    since the first purchase into the low 32 bits, so one argsort puts the line
+    items in (customer, invoicedate) order and the runs of equal keys are the
+    purchases, summed with segmented reductions. None when no line has both a
+    customer and a date.
+    """
+    valid = (df['customerid'].notna() & df['invoicedate'].notna()).to_numpy()
+    if not valid.any():
+        return None
+    if isinstance(df['customerid'].dtype, pd.CategoricalDtype):
+        # Dimension IDs are already integers, no need to factorize the labels
+        customer = df['customerid'].cat.codes.to_numpy()[valid]
+    else:
+        customer, _ = pd.factorize(df['customerid'].to_numpy()[valid])
+    seconds = df['invoicedate'].to_numpy(dtype='M8[s]').astype(np.int64)[valid]
+    keys = (customer.astype(np.int64) << 32) | (seconds - seconds.min())
+
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts, lines = segments(keys)
+    values = np.nan_to_num(df['totalprice'].to_numpy(dtype=float)[valid][order])
+    purchases = keys[starts]
+    return {
+        'customer': purchases >> 32,
+        'seconds': purchases & 0xFFFFFFFF,
+        'revenue': np.add.reduceat(values, starts),
+        'lines': lines,
+    }
+
+def segment_metrics(events, config):
+    """Per-customer and per-session metrics with diffs and segmented reductions over sorted purchases"""
+    customer = events['customer']
+    seconds = events['seconds']
+    revenue = events['revenue']
+
+    # Customer segments
+    starts, purchases = segments(customer)
+    ends = starts + purchases - 1
+    first = np.zeros(len(customer), dtype=bool)
+    first[starts] = True
+
+    # Intervals between consecutive purchases of the same customer
+    gap = np.r_[0, np.diff(seconds)]
+    intervals = gap[~first] / SECONDS_PER_DAY
+
+    span_days = (seconds[ends] - seconds[starts]) / SECONDS_PER_DAY
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_interval = np.where(purchases > 1, span_days / (purchases - 1), np.nan)
+    recency = (seconds.max() - seconds[ends]) / SECONDS_PER_DAY
+
+    customers = {
+        'purchases': purchases,
+        'revenue': np.add.reduceat(revenue, starts),
+        'mean_interval': mean_interval,
+        'recency': recency,
+        'churned': recency > config['churn_days'],
+    }
+
+    # Sessions: a new customer or a long enough pause starts one
+    session_start = first | (gap > config['session_gap_minutes'] * 60)
+    session_starts = np.flatnonzero(session_start)
+    session_ends = np.r_[session_starts[1:], len(customer)] - 1
+    sessions = {
+        'purchases': session_ends - session_starts + 1,
+        'minutes': (seconds[session_ends] - seconds[session_starts]) / 60,
+        'revenue': np.add.reduceat(revenue, session_starts),
+        'lines': np.add.reduceat(events['lines'], session_starts),
+    }
+    return intervals, customers, sessions
+
+def analyze_purchases(df, reports_dir, viz_dir, config=PURCHASE_CONFIG):
+    """Inter-purchase intervals, purchase sessions and churn from one sort of the line items"""
+    print("\n=== Purchase Intervals and Sessions ===")
+
+    required = ['customerid', 'invoicedate', 'totalprice']
+    if not all(col in df.columns for col in required) or not pd.api.types.is_datetime64_dtype(df['invoicedate']):
+        print(f"Columns {required} not found, skipping purchase interval analysis")
+        return None
+
+    events = purchase_events(df)
+    if events is None:
+        print("No purchases with a customer and date, skipping purchase interval analysis")
+        return None
+    intervals, customers, sessions = segment_metrics(events, config)
+
+    n_customers = len(customers['purchases'])
+    repeat = customers['purchases'] > 1
+    print(f"Customers: {n_customers:,}, purchases: {len(events['customer']):,}, sessions: {len(sessions['purchases']):,}")
+    print(f"Repeat customers: {repeat.mean():.1%}")
+    if len(intervals):
+        print(f"Median days between purchases: {np.median(intervals):.1f}")
+    print(f"Churned (no purchase in the last {config['churn_days']} days): {customers['churned'].mean():.1%}")
+
+    results = {}
+
+    results['interpurchase_intervals'] = distribution(intervals, config['interval_bins'], ' days')
+
+    # Customers by number of purchases, with churn and value per group
+    by_purchases = distribution(customers['purchases'], config['purchase_bins'],
+                                revenue=customers['revenue'], churned=customers['churned'].astype(float),
+                                interval_days=np.nan_to_num(customers['mean_interval']),
+                                repeat=repeat.astype(float))
+    by_purchases = by_purchases.rename(columns={'bin': 'purchases', 'count': 'customers'})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        by_purchases['churn_rate'] = by_purchases['churned'] / by_purchases['customers']
+        by_purchases['mean_interval_days'] = by_purchases['interval_days'] / by_purchases['repeat']
+        by_purchases['revenue_per_customer'] = by_purchases['revenue'] / by_purchases['customers']
+    by_purchases['churned'] = by_purchases['churned'].astype(np.int64)
+    results['customer_activity'] = by_purchases.drop(columns=['interval_days', 'repeat'])
+
+    by_session = distribution(sessions['purchases'], config['session_bins'],
+                              revenue=sessions['revenue'], lines=sessions['lines'].astype(float),
+                              minutes=sessions['minutes'])
+    by_session = by_session.rename(columns={'bin': 'purchases_per_session', 'count': 'sessions'})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        by_session['mean_minutes'] = by_session['minutes'] / by_session['sessions']
+        by_session['revenue_per_session'] = by_session['revenue'] / by_session['sessions']
+    by_session['lines'] = by_session['lines'].astype(np.int64)
+    results['session_distribution'] = by_session.drop(columns=['minutes'])
+
+    for name, table in results.items():
+        report_file = os.path.join(reports_dir, f"{name}.csv")
+        table.to_csv(report_file, index=False)
+        print(f"Saved {name.replace('_', ' ')} to {report_file}")
+
+    # Interval distribution chart
+    table = results['interpurchase_intervals']
+    plt.figure(figsize=(12, 6))
+    plt.bar(table['bin'], table['count'])
+    plt.title('Days Between Purchases')
+    plt.xlabel('Interval')
+    plt.ylabel('Number of Repeat Purchases')
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    chart_file = os.path.join(viz_dir, "interpurchase_intervals.png")
+    plt.savefig(chart_file)
+    plt.close()
+    print(f"Saved purchase interval chart to {chart_file}")
+
+    return results
@@ -0,0 +1,174 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Ranking settings used by analyze_data
+RANKING_CONFIG = {
+    'top_n': 10,   # Length of the top products / top countries reports and charts
+    # Nested rankings: `levels` are ranked in order, each keeping its top n groups
+    # (None keeps all of them), then the top `top_n` items are ranked within every group
+    'rankings': [
+        {'name': 'top_products_by_country', 'item': 'description', 'levels': [('country', 15)], 'top_n': 20},
+        {'name': 'top_products_by_month', 'item': 'description', 'levels': [('year_month', None)], 'top_n': 20},
+        {'name': 'top_products_by_source', 'item': 'description', 'levels': [('data_source', None)], 'top_n': 20},
+    ],
+}
+
+# Above this many (group x item) cells the sparse path is used instead of a dense matrix
+MAX_DENSE_CELLS = 20_000_000
+
+# Sales totals are written rounded to this many decimals. Serial, partitioned, SQL
+# and incremental sums add the same values in different orders and only agree up to
+# rounding error, which this hides so every path writes the same report bytes.
+TOTAL_DECIMALS = 2
+
+# Derived dimensions and the column they are computed from
+DERIVED_COLUMNS = {
+    'year_month': 'invoicedate',
+}
+
+def ranking_columns(config=RANKING_CONFIG, value='totalprice'):
+    """Merged-data columns the configured rankings read"""
+    columns = {value}
+    for ranking in config['rankings']:
+        for column in [ranking['item']] + [level for level, _ in ranking['levels']]:
+            columns.add(DERIVED_COLUMNS.get(column, column))
+    return sorted(columns)
+
+def round_totals(table, columns=('totalprice',)):
+    """Round the total columns of a report table for writing"""
+    for column in columns:
+        table[column] = table[column].round(TOTAL_DECIMALS)
+    return table
+
+def top_n_indices(values, n):
+    """Indices of the n largest values, largest first, without sorting everything"""
+    if n is None or n >= len(values):
+        return np.argsort(-values, kind='stable')
+    top = np.argpartition(-values, n - 1)[:n]
+    return top[np.argsort(-values[top], kind='stable')]
+
+def top_n(table, value, n):
+    """The n rows of an aggregated table with the largest `value`"""
+    return table.iloc[top_n_indices(table[value].to_numpy(), n)]
+
+def top_n_per_group(group_codes, item_codes, values, n_groups, n_items, n):
+    """Aggregate values per (group, item) and select the top n items within every group
+
+    Returns (group, item, total, rank) arrays for the selected pairs. Uses a dense
+    group x item matrix with a row-wise argpartition when it fits, otherwise
+    aggregates only the pairs that occur and ranks them with one lexsort.
+    """
+    if n_groups * n_items <= MAX_DENSE_CELLS:
+        flat = group_codes.astype(np.int64) * n_items + item_codes
+        totals = np.bincount(flat, weights=values, minlength=n_groups * n_items).reshape(n_groups, n_items)
+        present = np.bincount(flat, minlength=n_groups * n_items).reshape(n_groups, n_items) > 0
+
+        # Absent pairs sort last
+        scores = np.where(present, totals, -np.inf)
+        k = n_items if n is None else min(n, n_items)
+        if k < n_items:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n_items), (n_groups, n_items))
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+
+        groups = np.repeat(np.arange(n_groups), k)
+        items = top.ravel()
+        ranks = np.tile(np.arange(1, k + 1), n_groups)
+        keep = present[groups, items]
+        return groups[keep], items[keep], totals[groups[keep], items[keep]], ranks[keep]
+
+    # Sparse path: aggregate the pairs that occur, then rank within groups
+    pairs, inverse = np.unique(group_codes.astype(np.int64) * n_items + item_codes, return_inverse=True)
+    totals = np.bincount(inverse, weights=values)
+    groups = pairs // n_items
+    items = pairs % n_items
+    order = np.lexsort((-totals, groups))
+    groups, items, totals = groups[order], items[order], totals[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    ranks = np.arange(len(groups)) - np.repeat(starts, np.diff(np.r_[starts, len(groups)])) + 1
+    keep = ranks <= (n if n is not None else len(groups))
+    return groups[keep], items[keep], totals[keep], ranks[keep]
+
+def dimension(values, column):
+    """Values of a ranking dimension from its source column, computing derived ones on the fly"""
+    if column == 'year_month':
+        return values.dt.strftime('%Y-%m')
+    return values
+
+def nested_ranking(df, item, levels, n, value='totalprice'):
+    """Rank `item` within nested groups, e.g. the top 20 products in each of the top 15 countries
+
+    Every level is ranked by total value inside the groups kept by the level above;
+    only rows of kept groups take part in the next level.
+    """
+    columns = [column for column, _ in levels] + [item]
+    valid = df[value].notna()
+    for column in columns:
+        if DERIVED_COLUMNS.get(column, column) not in df.columns:
+            return None
+    values = df.loc[valid, value].to_numpy(dtype=float)
+
+    codes = {}
+    labels = {}
+    for column in columns:
+        # Select the one source column first rather than copying every column of the frame
+        source = df.loc[valid, DERIVED_COLUMNS.get(column, column)]
+        codes[column], labels[column] = pd.factorize(dimension(source, column))
+    rows = np.ones(len(values), dtype=bool)
+    for column in columns:
+        rows &= codes[column] >= 0
+
+    # Group of every row at the current level, and the path (codes, totals, ranks) of each group
+    group_of_row = np.zeros(len(values), dtype=np.int64)
+    paths = {'codes': [], 'totals': [], 'ranks': []}
+    n_groups = 1
+
+    for column, level_n in levels + [(item, n)]:
+        groups, items, totals, ranks = top_n_per_group(
+            group_of_row[rows], codes[column][rows], values[rows], n_groups, len(labels[column]), level_n)
+
+        # Carry each kept pair's parent path along and make the pair the group for the next level
+        paths['codes'] = [path[groups] for path in paths['codes']] + [items]
+        paths['totals'] = [path[groups] for path in paths['totals']] + [totals]
+        paths['ranks'] = [path[groups] for path in paths['ranks']] + [ranks]
+
+        pair_index = np.full(n_groups * len(labels[column]), -1, dtype=np.int64)
+        pair_index[groups * len(labels[column]) + items] = np.arange(len(groups))
+        next_group = np.full(len(values), -1, dtype=np.int64)
+        next_group[rows] = pair_index[group_of_row[rows] * len(labels[column]) + codes[column][rows]]
+        rows = rows & (next_group >= 0)
+        group_of_row = np.where(rows, next_group, 0)
+        n_groups = max(len(groups), 1)
+
+    result = {}
+    for i, column in enumerate(columns):
+        result[column] = np.asarray(labels[column])[paths['codes'][i]]
+        name = 'rank' if column == item else f'{column}_rank'
+        result[name] = paths['ranks'][i]
+        result[value if column == item else f'{column}_{value}'] = paths['totals'][i]
+    return pd.DataFrame(result)
+
+def analyze_rankings(df, reports_dir, config=RANKING_CONFIG, value='totalprice'):
+    """Write every configured nested ranking as a report"""
+    print("\n=== Rankings ===")
+
+    if value not in df.columns:
+        print(f"{value} column not found, skipping rankings")
+        return None
+
+    results = {}
+    for ranking in config['rankings']:
+        ranked = nested_ranking(df, ranking['item'], ranking['levels'], ranking['top_n'], value)
+        if ranked is None:
+            print(f"Columns for {ranking['name']} not found, skipping")
+            continue
+
+        ranking_file = os.path.join(reports_dir, f"{ranking['name']}.csv")
+        ranked.to_csv(ranking_file, index=False)
+        print(f"Saved {ranking['name'].replace('_', ' ')} ({len(ranked):,} rows) to {ranking_file}")
+        results[ranking['name']] = ranked
+
+    return results
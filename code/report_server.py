@@ -0,0 +1,244 @@
+import os
+import json
+import asyncio
+import hashlib
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import pandas as pd
+
+# Paths relative to the project root, same layout analyze_data writes to
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.dirname(current_dir)
+REPORTS_DIR = os.path.join(parent_dir, "reports")
+VIZ_DIR = os.path.join(parent_dir, "visualizations")
+
+STATUS_TEXT = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+class LRUCache:
+    """In-memory LRU cache of encoded response bodies, bounded by total bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        body = entry[1]
+        if len(body) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.current_bytes -= len(self.entries.pop(key)[1])
+        self.entries[key] = entry
+        self.current_bytes += len(body)
+        # Evict least recently used entries until we fit the budget again
+        while self.current_bytes > self.max_bytes:
+            _, (_, old_body) = self.entries.popitem(last=False)
+            self.current_bytes -= len(old_body)
+
+def list_outputs():
+    """List the report CSVs and chart PNGs currently on disk"""
+    reports = {}
+    charts = {}
+    if os.path.isdir(REPORTS_DIR):
+        for entry in os.scandir(REPORTS_DIR):
+            if entry.is_file() and entry.name.endswith(".csv"):
+                reports[entry.name[:-4]] = entry
+    if os.path.isdir(VIZ_DIR):
+        for entry in os.scandir(VIZ_DIR):
+            if entry.is_file() and entry.name.endswith(".png"):
+                charts[entry.name[:-4]] = entry
+    return reports, charts
+
+def data_version(reports, charts):
+    """Fingerprint of the output files, used as the ETag for every response"""
+    digest = hashlib.sha1()
+    for kind, entries in (("r", reports), ("c", charts)):
+        for name in sorted(entries):
+            stat = entries[name].stat()
+            digest.update(f"{kind}:{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+def load_report(path, fmt):
+    """Read a report CSV and encode it as JSON records or raw CSV"""
+    if fmt == "csv":
+        with open(path, "rb") as f:
+            return "text/csv; charset=utf-8", f.read()
+    df = pd.read_csv(path)
+    if os.path.basename(path) == "basic_statistics.csv" and list(df.columns) == ["Metric", "Value"]:
+        # Basic statistics read more naturally as a single object
+        payload = dict(zip(df["Metric"], df["Value"]))
+    else:
+        payload = json.loads(df.to_json(orient="records"))
+    return "application/json", json.dumps(payload).encode()
+
+def load_chart(path):
+    with open(path, "rb") as f:
+        return "image/png", f.read()
+
+class ReportServer:
+    """Serve the precomputed reports and charts over HTTP using asyncio"""
+
+    def __init__(self, cache_bytes=64 * 1024 * 1024):
+        self.cache = LRUCache(cache_bytes)
+        # Loads in progress, so concurrent misses for the same body share one read
+        self.pending = {}
+
+    async def get_body(self, key, loader, *args):
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+        future = self.pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(asyncio.to_thread(loader, *args))
+            self.pending[key] = future
+            try:
+                entry = await future
+                self.cache.put(key, entry)
+            finally:
+                self.pending.pop(key, None)
+            return entry
+        return await asyncio.shield(future)
+
+    async def route(self, path, query):
+        """Return (status, content_type, body, etag) for a GET request"""
+        reports, charts = await asyncio.to_thread(list_outputs)
+        version = await asyncio.to_thread(data_version, reports, charts)
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+
+        if not parts:
+            index = {
+                "version": version,
+                "reports": sorted(reports),
+                "charts": sorted(charts),
+                "cache": {
+                    "entries": len(self.cache.entries),
+                    "bytes": self.cache.current_bytes,
+                    "hits": self.cache.hits,
+                    "misses": self.cache.misses,
+                },
+            }
+            return 200, "application/json", json.dumps(index).encode(), None
+
+        if parts == ["stats"]:
+            parts = ["reports", "basic_statistics"]
+
+        if len(parts) == 2 and parts[0] == "reports":
+            name = parts[1]
+            fmt = query.get("format", ["json"])[0]
+            if name.endswith(".csv"):
+                name, fmt = name[:-4], "csv"
+            if fmt not in ("json", "csv"):
+                return 400, "text/plain", b"format must be json or csv", None
+            if name not in reports:
+                return 404, "text/plain", f"Unknown report: {name}".encode(), None
+            content_type, body = await self.get_body((version, "report", name, fmt), load_report, reports[name].path, fmt)
+            return 200, content_type, body, version
+
+        if len(parts) == 2 and parts[0] == "charts":
+            name = parts[1][:-4] if parts[1].endswith(".png") else parts[1]
+            if name not in charts:
+                return 404, "text/plain", f"Unknown chart: {name}".encode(), None
+            content_type, body = await self.get_body((version, "chart", name), load_chart, charts[name].path)
+            return 200, content_type, body, version
+
+        return 404, "text/plain", b"Not found", None
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                lines = head.decode("latin1").split("\r\n")
+                request_line = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                keep_alive = (len(request_line) == 3 and request_line[2] == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+
+                if len(request_line) != 3:
+                    status, content_type, body, etag = 400, "text/plain", b"Bad request", None
+                elif request_line[0] not in ("GET", "HEAD"):
+                    status, content_type, body, etag = 405, "text/plain", b"Only GET and HEAD are supported", None
+                else:
+                    url = urlsplit(request_line[1])
+                    try:
+                        status, content_type, body, etag = await self.route(url.path, parse_qs(url.query))
+                    except Exception as e:
+                        print(f"Error serving {request_line[1]}: {e}")
+                        status, content_type, body, etag = 500, "text/plain", b"Internal server error", None
+
+                    if etag is not None and headers.get("if-none-match") == f'"{etag}"':
+                        status, body = 304, b""
+
+                response = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+                            f"Content-Type: {content_type}",
+                            f"Content-Length: {len(body)}",
+                            "Connection: " + ("keep-alive" if keep_alive else "close")]
+                if etag is not None:
+                    response.append(f'ETag: "{etag}"')
+                    response.append("Cache-Control: no-cache")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode())
+                if request_line and request_line[0] != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+async def serve(host, port, cache_bytes):
+    server = ReportServer(cache_bytes)
+    http_server = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving reports from {REPORTS_DIR}")
+    print(f"Serving charts from {VIZ_DIR}")
+    print(f"Listening on http://{host}:{port}/")
+    async with http_server:
+        await http_server.serve_forever()
+
+def main():
+    """Start the local report server"""
+    parser = argparse.ArgumentParser(description="Serve sales reports and charts over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--cache-mb", type=int, default=64, help="Size of the in-memory response cache")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.cache_mb * 1024 * 1024))
+    except KeyboardInterrupt:
+        print("\nReport server stopped.")
+
+if __name__ == "__main__":
+    main()
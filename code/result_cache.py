@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import inspect
+import importlib.util
+
+import pandas as pd
+
+def digest_series(series):
+    """Content hash of one column, including its dtype"""
+    values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    digest = hashlib.sha1(str(series.dtype).encode())
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+def digest_config(config):
+    """Stable hash of a settings dict (numpy arrays are hashed by value)"""
+    encoded = json.dumps(config, sort_keys=True,
+                         default=lambda value: value.tolist() if hasattr(value, 'tolist') else repr(value))
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+def digest_source(source):
+    """Hash of a report function's module, or of a module given by name, so code changes invalidate its results"""
+    try:
+        if isinstance(source, str):
+            # Locate the module without importing it (analysis itself runs as __main__)
+            path = importlib.util.find_spec(source).origin
+        else:
+            path = inspect.getsourcefile(source)
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (TypeError, OSError, AttributeError, ImportError):
+        return 'unknown'
+
+class ResultCache:
+    """On-disk cache of report outputs keyed by input data version and configuration
+
+    Every report stage gets its own key, built from the content hashes of only the
+    columns it reads, its configuration and its source modules. On a hit the cached
+    files are copied back into place and the stage is skipped. Entries are evicted
+    least recently used first once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Column digests per frame, so shared columns are only hashed once per run
+        self._digests = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def column_digest(self, df, column):
+        cache_key = (id(df), column)
+        if cache_key not in self._digests:
+            if column in df.columns:
+                self._digests[cache_key] = digest_series(df[column])
+            else:
+                self._digests[cache_key] = 'missing'
+        return self._digests[cache_key]
+
+    def key(self, name, df, columns, config=None, source=None, inputs=None, sources=None):
+        """Cache key for one report stage
+
+        `source` is the stage's report function and `sources` the names of the other
+        modules whose code it depends on.
+        """
+        digest = hashlib.sha1(name.encode())
+        for column in sorted(columns):
+            digest.update(f"{column}={self.column_digest(df, column)};".encode())
+        for input_name, input_df in sorted((inputs or {}).items()):
+            for column in sorted(input_df.columns):
+                digest.update(f"{input_name}.{column}={self.column_digest(input_df, column)};".encode())
+        digest.update(digest_config(config or {}).encode())
+        for dependency in [source] + list(sources or []):
+            if dependency is not None:
+                digest.update(digest_source(dependency).encode())
+        return digest.hexdigest()[:20]
+
+    def entry_dir(self, name, key):
+        return os.path.join(self.cache_dir, name, key)
+
+    def restore(self, name, key, outputs):
+        """Copy a cached entry's files back to their output paths; False on a miss"""
+        entry = self.entry_dir(name, key)
+        manifest_file = os.path.join(entry, "manifest.json")
+        if not os.path.exists(manifest_file):
+            self.misses += 1
+            return False
+
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+        destinations = {os.path.basename(path): path for path in outputs}
+        if not all(file_name in destinations and os.path.exists(os.path.join(entry, file_name))
+                   for file_name in manifest['files']):
+            self.misses += 1
+            return False
+
+        for file_name in manifest['files']:
+            path = destinations[file_name]
+            cached_file = os.path.join(entry, file_name)
+            # Write next to the destination first so readers never see a partial file
+            tmp_file = path + ".tmp"
+            shutil.copyfile(cached_file, tmp_file)
+            os.replace(tmp_file, path)
+
+        manifest['last_used'] = time.time()
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f)
+
+        self.hits += 1
+        return True
+
+    def store(self, name, key, outputs):
+        """Save the files a stage just wrote under its key"""
+        entry = self.entry_dir(name, key)
+        tmp_entry = entry + ".tmp"
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        os.makedirs(tmp_entry)
+
+        files = []
+        size = 0
+        for path in outputs:
+            if os.path.exists(path):
+                shutil.copyfile(path, os.path.join(tmp_entry, os.path.basename(path)))
+                files.append(path)
+                size += os.path.getsize(path)
+
+        manifest = {
+            'name': name,
+            'key': key,
+            'files': [os.path.basename(path) for path in files],
+            'size': size,
+            'created': time.time(),
+            'last_used': time.time(),
+        }
+        with open(os.path.join(tmp_entry, "manifest.json"), 'w') as f:
+            json.dump(manifest, f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_entry, entry)
+
+    def entries(self):
+        """All complete cache entries with their manifests"""
+        found = []
+        for name in os.listdir(self.cache_dir):
+            report_dir = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(report_dir):
+                continue
+            for key in os.listdir(report_dir):
+                manifest_file = os.path.join(report_dir, key, "manifest.json")
+                if os.path.exists(manifest_file):
+                    with open(manifest_file) as f:
+                        found.append((os.path.join(report_dir, key), json.load(f)))
+        return found
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self.entries(), key=lambda item: item[1]['last_used'])
+        total = sum(manifest['size'] for _, manifest in entries)
+        evicted = 0
+        while entries and total > self.max_bytes:
+            entry, manifest = entries.pop(0)
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= manifest['size']
+            evicted += 1
+        if evicted:
+            print(f"Evicted {evicted} old result cache entries")
+        return evicted
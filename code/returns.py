@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pandas as pd
+
+from ranking import round_totals
+
+# Report name -> column the return rates are grouped by
+RETURN_DIMENSIONS = {
+    'product': 'description',
+    'country': 'country',
+    'month': 'year_month',
+}
+
+def add_year_month(df):
+    """Return the frame with a year_month column (YYYY-MM) when it has dates"""
+    if 'invoicedate' in df.columns and pd.api.types.is_datetime64_dtype(df['invoicedate']):
+        df = df.assign(year_month=df['invoicedate'].dt.strftime('%Y-%m'))
+    return df
+
+def return_totals(sales, returns_df, key):
+    """Sold vs returned quantity and value per group (additive, so totals can be summed)"""
+    sold = sales.groupby(key, observed=True).agg(
+        sold_quantity=('quantity', 'sum'),
+        sold_value=('totalprice', 'sum'),
+    )
+    returned = returns_df.groupby(key, observed=True).agg(
+        returned_quantity=('quantity', 'sum'),
+        returned_value=('totalprice', 'sum'),
+        return_lines=('totalprice', 'size'),
+    )
+    # Integer-coded dimensions are decoded to their labels here
+    sold.index = sold.index.astype(object)
+    returned.index = returned.index.astype(object)
+    # Groups missing on one side are filled with 0 and keep their column's dtype
+    dtypes = {**sold.dtypes.to_dict(), **returned.dtypes.to_dict()}
+    return sold.join(returned, how='outer').fillna(0).astype(dtypes)
+
+def add_return_rates(totals):
+    """Add the return rates to a table of sold/returned totals
+
+    The values are rounded first, so every path that sums them writes the same rates.
+    """
+    rates = round_totals(totals.copy(), ['sold_value', 'returned_value'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates['return_rate_quantity'] = np.where(rates['sold_quantity'] > 0,
+                                                 rates['returned_quantity'] / rates['sold_quantity'], np.nan)
+        rates['return_rate_value'] = np.where(rates['sold_value'] > 0,
+                                              rates['returned_value'] / rates['sold_value'], np.nan)
+    return rates.reset_index()
+
+def return_rates(sales, returns_df, key):
+    """Sold vs returned quantity and value per group, with the resulting return rates"""
+    return add_return_rates(return_totals(sales, returns_df, key))
+
+def save_return_rates(name, key, rates, reports_dir):
+    """Sort and save one return-rate report"""
+    if name == 'month':
+        rates = rates.sort_values(key)
+    else:
+        rates = rates.sort_values('returned_value', ascending=False)
+
+    rates_file = os.path.join(reports_dir, f"return_rates_by_{name}.csv")
+    rates.to_csv(rates_file, index=False)
+    print(f"Saved return rates by {name} to {rates_file}")
+    return rates
+
+def analyze_returns(df, returns_df, reports_dir):
+    """Compute return rates by product, country and month from the returns partition"""
+    print("\n=== Returns Analysis ===")
+
+    required = ['quantity', 'totalprice']
+    if not all(col in df.columns for col in required) or not all(col in returns_df.columns for col in required):
+        print("Quantity or TotalPrice column not found, skipping return rates")
+        return None
+
+    total_sold = df['totalprice'].sum()
+    total_returned = returns_df['totalprice'].sum()
+    print(f"Returned Value: {total_returned:,.2f}")
+    if total_sold > 0:
+        print(f"Overall Return Rate: {total_returned / total_sold:.2%}")
+    if 'return_type' in returns_df.columns:
+        print("Lines by return type:")
+        print(returns_df['return_type'].value_counts())
+
+    sales = add_year_month(df)
+    returns_df = add_year_month(returns_df)
+
+    results = {}
+    for name, key in RETURN_DIMENSIONS.items():
+        if key not in sales.columns or key not in returns_df.columns:
+            print(f"{key} column not found, skipping return rates by {name}")
+            continue
+
+        rates = return_rates(sales, returns_df, key)
+        results[name] = save_return_rates(name, key, rates, reports_dir)
+
+    return results
@@ -0,0 +1,200 @@
+import os
+import glob
+import time
+import argparse
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from analysis import print_header, basic_statistics_frame, add_month_labels, add_day_names, round_totals
+from ranking import RANKING_CONFIG
+
+# Same reports analyze_data writes, expressed over the `sales` view
+REPORT_QUERIES = {
+    'basic_statistics': """
+        SELECT {total_sales} AS total_sales,
+               {transactions} AS num_transactions,
+               {customers} AS num_customers,
+               {products} AS num_products,
+               {countries} AS num_countries,
+               {min_date} AS min_date,
+               {max_date} AS max_date
+        FROM sales
+    """,
+    'monthly_sales': """
+        SELECT year(invoicedate) AS year, month(invoicedate) AS month, COALESCE(SUM(totalprice), 0) AS totalprice
+        FROM sales
+        WHERE invoicedate IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """,
+    'daily_sales': """
+        SELECT isodow(invoicedate) - 1 AS dayofweek, COALESCE(SUM(totalprice), 0) AS totalprice
+        FROM sales
+        WHERE invoicedate IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """,
+    'top_products': """
+        SELECT description, COALESCE(SUM(totalprice), 0) AS totalprice
+        FROM sales
+        WHERE description IS NOT NULL
+        GROUP BY 1
+        ORDER BY 2 DESC
+        LIMIT {top_n}
+    """,
+    'country_sales': """
+        SELECT country, COALESCE(SUM(totalprice), 0) AS totalprice
+        FROM sales
+        WHERE country IS NOT NULL
+        GROUP BY 1
+        ORDER BY 2 DESC
+        LIMIT {top_n}
+    """,
+}
+
+def find_combined_file(cleaned_dir):
+    """Most recent merged dataset written by merge_datasets"""
+    combined_files = glob.glob(os.path.join(cleaned_dir, "combined_sales_data_*.csv"))
+    if not combined_files:
+        return None
+    return max(combined_files, key=os.path.getmtime)
+
+def connect(files, threads=None, memory_limit=None, temp_dir=None):
+    """Open an in-process DuckDB connection with a `sales` view over the files
+
+    The CSVs are scanned lazily by every query, so nothing is loaded up front and
+    DuckDB can spill to temp_dir when an aggregation does not fit in memory.
+    """
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+    if temp_dir:
+        con.execute(f"SET temp_directory = '{temp_dir}'")
+
+    file_list = ", ".join("'" + path.replace("'", "''") + "'" for path in files)
+    con.execute(f"""
+        CREATE VIEW raw_sales AS
+        SELECT * FROM read_csv([{file_list}], header = true, all_varchar = true, union_by_name = true)
+    """)
+
+    # Type the measure and date columns the same way the pandas path sees them
+    columns = [row[0] for row in con.execute("DESCRIBE raw_sales").fetchall()]
+    casts = {
+        'totalprice': "TRY_CAST(totalprice AS DOUBLE) AS totalprice",
+        'invoicedate': "TRY_CAST(invoicedate AS TIMESTAMP) AS invoicedate",
+    }
+    select = ", ".join(casts.get(col, f'"{col}"') for col in columns)
+    con.execute(f"CREATE VIEW sales AS SELECT {select} FROM raw_sales")
+    return con, columns
+
+def run_sql_reports(files, reports_dir, threads=None, memory_limit=None, temp_dir=None):
+    """Compute the standard reports with DuckDB and save them like analyze_data does"""
+    print_header("SQL BACKEND")
+
+    if duckdb is None:
+        print("duckdb is not installed. Install it with: pip install duckdb")
+        return None
+
+    print("Scanning:")
+    for path in files:
+        print(f"- {path}")
+
+    start_time = time.time()
+    con, columns = connect(files, threads, memory_limit, temp_dir)
+    threads_used = con.execute("SELECT current_setting('threads')").fetchone()[0]
+    print(f"Running queries on {threads_used} threads")
+
+    reports = {}
+
+    # Basic statistics, with 'N/A' for columns the data does not have
+    aggregates = {
+        'total_sales': ('totalprice', "COALESCE(SUM(totalprice), 0)"),
+        'transactions': ('invoiceno', "COUNT(DISTINCT invoiceno)"),
+        'customers': ('customerid', "COUNT(DISTINCT customerid)"),
+        'products': ('description', "COUNT(DISTINCT description)"),
+        'countries': ('country', "COUNT(DISTINCT country)"),
+        'min_date': ('invoicedate', "MIN(invoicedate)"),
+        'max_date': ('invoicedate', "MAX(invoicedate)"),
+    }
+    query = REPORT_QUERIES['basic_statistics'].format(**{
+        name: expression if col in columns else "NULL"
+        for name, (col, expression) in aggregates.items()
+    })
+    row = con.execute(query).fetchone()
+    total_sales, num_transactions, num_customers, num_products, num_countries, min_date, max_date = row
+    if 'totalprice' not in columns:
+        total_sales = 'N/A'
+    values = [num_transactions, num_customers, num_products, num_countries]
+    num_transactions, num_customers, num_products, num_countries = [
+        'N/A' if value is None else value for value in values
+    ]
+    date_range = f"{pd.Timestamp(min_date)} to {pd.Timestamp(max_date)}" if min_date is not None else 'N/A'
+    reports['basic_statistics'] = basic_statistics_frame(
+        total_sales, num_transactions, num_customers, num_products, num_countries, date_range)
+
+    # Grouped reports
+    required = {
+        'monthly_sales': ['invoicedate', 'totalprice'],
+        'daily_sales': ['invoicedate', 'totalprice'],
+        'top_products': ['description', 'totalprice'],
+        'country_sales': ['country', 'totalprice'],
+    }
+    for name, needed in required.items():
+        if not all(col in columns for col in needed):
+            print(f"Skipping {name}: columns {needed} not found")
+            continue
+        report = con.execute(REPORT_QUERIES[name].format(top_n=int(RANKING_CONFIG['top_n']))).df()
+        # DuckDB's parallel sums round differently from pandas; rounded totals match exactly
+        reports[name] = round_totals(report)
+
+    if 'monthly_sales' in reports:
+        reports['monthly_sales'] = add_month_labels(reports['monthly_sales'])
+    if 'daily_sales' in reports:
+        reports['daily_sales'] = add_day_names(reports['daily_sales'])
+
+    con.close()
+    print(f"Queries finished in {time.time() - start_time:.2f} seconds")
+
+    os.makedirs(reports_dir, exist_ok=True)
+    for name, report in reports.items():
+        report_file = os.path.join(reports_dir, f"{name}.csv")
+        report.to_csv(report_file, index=False)
+        print(f"Saved {name.replace('_', ' ')} to {report_file}")
+
+    return reports
+
+def main():
+    """Run the standard reports with the embedded SQL engine"""
+    current_dir = os.path.abspath(os.path.dirname(__file__))
+    parent_dir = os.path.dirname(current_dir)
+
+    parser = argparse.ArgumentParser(description="Compute the sales reports with DuckDB over the cleaned files")
+    parser.add_argument("--source", nargs="+",
+                        help="CSV files or glob patterns to scan (default: latest combined_sales_data_*.csv)")
+    parser.add_argument("--output-dir", default=os.path.join(parent_dir, "reports"))
+    parser.add_argument("--threads", type=int, help="Worker threads (default: all cores)")
+    parser.add_argument("--memory-limit", help="Memory limit before spilling to disk, e.g. 4GB")
+    parser.add_argument("--temp-dir", help="Spill directory for out-of-core aggregation")
+    args = parser.parse_args()
+
+    if args.source:
+        files = sorted({path for pattern in args.source for path in glob.glob(pattern)})
+    else:
+        combined_file = find_combined_file(os.path.join(parent_dir, "data", "cleaned"))
+        files = [combined_file] if combined_file else []
+
+    if not files:
+        print("No cleaned data files found. Run the main analysis script first.")
+        return
+
+    run_sql_reports(files, args.output_dir, args.threads, args.memory_limit, args.temp_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Countries that occur in the Online Retail datasets; anything else is flagged
+KNOWN_COUNTRIES = [
+    'Australia', 'Austria', 'Bahrain', 'Belgium', 'Bermuda', 'Brazil', 'Canada', 'Channel Islands',
+    'Cyprus', 'Czech Republic', 'Denmark', 'EIRE', 'European Community', 'Finland', 'France',
+    'Germany', 'Greece', 'Hong Kong', 'Iceland', 'Israel', 'Italy', 'Japan', 'Korea', 'Lebanon',
+    'Lithuania', 'Malta', 'Netherlands', 'Nigeria', 'Norway', 'Poland', 'Portugal', 'RSA',
+    'Saudi Arabia', 'Singapore', 'Spain', 'Sweden', 'Switzerland', 'Thailand', 'USA',
+    'United Arab Emirates', 'United Kingdom', 'West Indies',
+]
+
+# Declarative data quality rules checked by clean_dataset on the cleaned rows.
+# Rule types:
+#   range       column outside [min, max] (either bound may be None)
+#   not_null    column is missing
+#   allowed     column value not in `values`
+#   parsed      value present in the raw data but could not be parsed
+#   date_bounds date before `min` or after `max` (None = the time of the run)
+#   outlier     value more than `factor` times above or below the median of its `by` group
+#   consistent  a `by` group (e.g. one invoice) has more than one distinct value
+# Group rules (outlier, consistent) need every row of a group, so they are checked
+# once per data source on the merged data rather than on each cleaned frame or chunk.
+VALIDATION_CONFIG = {
+    'sample_rows': 5,   # Violating rows kept per rule and data source
+    'rules': [
+        {'name': 'quantity_range', 'type': 'range', 'column': 'quantity', 'min': 1, 'max': 10_000},
+        {'name': 'unitprice_range', 'type': 'range', 'column': 'unitprice', 'min': 0.01, 'max': 10_000},
+        {'name': 'totalprice_missing', 'type': 'not_null', 'column': 'totalprice'},
+        {'name': 'customerid_missing', 'type': 'not_null', 'column': 'customerid'},
+        {'name': 'fx_rate_missing', 'type': 'not_null', 'column': 'fx_rate'},
+        {'name': 'country_unknown', 'type': 'allowed', 'column': 'country', 'values': KNOWN_COUNTRIES},
+        {'name': 'invoicedate_unparsed', 'type': 'parsed', 'column': 'invoicedate'},
+        {'name': 'invoicedate_bounds', 'type': 'date_bounds', 'column': 'invoicedate',
+         'min': '2009-12-01', 'max': None},
+        {'name': 'unitprice_outlier', 'type': 'outlier', 'column': 'unitprice', 'by': 'stockcode', 'factor': 10},
+        {'name': 'invoice_customer_mismatch', 'type': 'consistent', 'column': 'customerid', 'by': 'invoiceno'},
+        {'name': 'invoice_country_mismatch', 'type': 'consistent', 'column': 'country', 'by': 'invoiceno'},
+    ],
+}
+
+GROUP_RULES = ['outlier', 'consistent']
+
+# Columns shown next to every sampled violation
+SAMPLE_COLUMNS = ['invoiceno', 'stockcode', 'description', 'quantity', 'unitprice',
+                  'invoicedate', 'customerid', 'country']
+
+def rule_columns(rule):
+    return [rule['column']] + ([rule['by']] if 'by' in rule else [])
+
+def violations(df, rule, unparsed=None, within=None):
+    """Boolean mask of the rows breaking one rule, computed with vectorized column operations
+
+    `unparsed` maps a column to its raw values on the rows where parsing failed (NaN elsewhere).
+    Group rules form their groups within each value of the `within` column, if given.
+    """
+    column = rule['column']
+    values = df[column]
+    kind = rule['type']
+
+    if kind == 'range':
+        mask = pd.Series(False, index=df.index)
+        if rule.get('min') is not None:
+            mask |= values < rule['min']
+        if rule.get('max') is not None:
+            mask |= values > rule['max']
+        return mask
+    if kind == 'not_null':
+        return values.isna()
+    if kind == 'allowed':
+        return values.notna() & ~values.isin(rule['values'])
+    if kind == 'parsed':
+        if unparsed is None or column not in unparsed:
+            return pd.Series(False, index=df.index)
+        return unparsed[column].notna()
+    if kind == 'date_bounds':
+        if not pd.api.types.is_datetime64_dtype(values):
+            return pd.Series(False, index=df.index)
+        low = pd.Timestamp(rule['min']) if rule.get('min') is not None else None
+        high = pd.Timestamp(rule['max']) if rule.get('max') is not None else pd.Timestamp.now()
+        mask = values > high
+        if low is not None:
+            mask |= values < low
+        return mask
+    groups = [df[key] for key in ([within] if within else []) + [rule['by']]] if 'by' in rule else None
+    if kind == 'outlier':
+        median = values.groupby(groups, observed=True).transform('median')
+        ratio = values / median
+        return (ratio > rule['factor']) | (ratio < 1 / rule['factor'])
+    if kind == 'consistent':
+        # Groups with more than one distinct value; rows without a group are never flagged
+        return values.groupby(groups, observed=True).transform('nunique') > 1
+    raise ValueError(f"Unknown rule type: {kind}")
+
+class DataQualityReport:
+    """Collects rule violations from every cleaned dataset and saves the quality report
+
+    clean_dataset calls `check` on the frame it is cleaning, so the row rules run
+    in the same pass over data that is already in memory. The group rules run in
+    `check_groups` on the merged data, so their counts do not depend on how a file
+    was chunked or batched. Only violation counts per data source and a bounded
+    sample of violating rows per rule are kept.
+    """
+
+    def __init__(self, config=VALIDATION_CONFIG):
+        self.config = config
+        self.summaries = []
+        self.samples = []
+
+    def check(self, df, unparsed=None):
+        """Run every applicable row rule on a cleaned frame (or chunk)"""
+        print("\n=== Data Quality Checks ===")
+        self.run([rule for rule in self.config['rules'] if rule['type'] not in GROUP_RULES], df, unparsed)
+
+    def check_groups(self, df):
+        """Run every applicable group rule on the merged data, with groups formed per data source
+
+        Sampled rows are numbered by their row in the merged data.
+        """
+        print("\n=== Group Quality Checks ===")
+        self.run([rule for rule in self.config['rules'] if rule['type'] in GROUP_RULES], df,
+                 within='data_source' if 'data_source' in df.columns else None)
+
+    def run(self, rules, df, unparsed=None, within=None):
+        """Count and sample the violations of some rules on one frame"""
+        sources = df['data_source'] if 'data_source' in df.columns else pd.Series('unknown', index=df.index)
+        source_codes, source_names = pd.factorize(sources.fillna('unknown'))
+        checked = np.bincount(source_codes, minlength=len(source_names))
+        n_samples = self.config['sample_rows']
+
+        for rule in rules:
+            if not all(column in df.columns for column in rule_columns(rule)):
+                continue
+
+            mask = violations(df, rule, unparsed, within).fillna(False).to_numpy(dtype=bool)
+            counts = np.bincount(source_codes[mask], minlength=len(source_names))
+            self.summaries.append(pd.DataFrame({
+                'data_source': np.asarray(source_names),
+                'rule': rule['name'],
+                'column': rule['column'],
+                'rows_checked': checked,
+                'violations': counts,
+            }))
+            if counts.sum():
+                print(f"{rule['name']}: {counts.sum():,} rows")
+
+            # First few violating rows of each data source
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                ranks = pd.Series(source_codes[rows]).groupby(source_codes[rows]).cumcount().to_numpy()
+                rows = rows[ranks < n_samples]
+                sample = df.iloc[rows][[c for c in ['data_source'] + SAMPLE_COLUMNS if c in df.columns]].copy()
+                sample.insert(0, 'rule', rule['name'])
+                sample.insert(1, 'row', df.index[rows])
+                if rule['type'] == 'parsed':
+                    sample['value'] = unparsed[rule['column']].iloc[rows].to_numpy()
+                else:
+                    sample['value'] = df[rule['column']].iloc[rows].to_numpy()
+                self.samples.append(sample)
+
+    def positions(self, column):
+        """Sort key: rules in config order, data sources in the order they were first checked"""
+        if column.name == 'rule':
+            order = [rule['name'] for rule in self.config['rules']]
+        else:
+            order = pd.unique(column)
+        return column.map({value: i for i, value in enumerate(order)})
+
+    def summary(self):
+        if not self.summaries:
+            return pd.DataFrame(columns=['data_source', 'rule', 'column', 'rows_checked',
+                                         'violations', 'violation_rate'])
+        summary = pd.concat(self.summaries, ignore_index=True)
+        # Batches of one source are checked separately; add them up
+        summary = summary.groupby(['data_source', 'rule', 'column'], sort=False, as_index=False).sum()
+        # Group rules are checked last; list every source's rules in config order
+        summary = summary.sort_values(['data_source', 'rule'], key=self.positions, kind='stable', ignore_index=True)
+        summary['violation_rate'] = summary['violations'] / summary['rows_checked'].where(summary['rows_checked'] > 0)
+        return summary
+
+    def save(self, reports_dir):
+        """Write the violation counts and the sampled violating rows"""
+        os.makedirs(reports_dir, exist_ok=True)
+        summary = self.summary()
+        summary_file = os.path.join(reports_dir, "data_quality.csv")
+        summary.to_csv(summary_file, index=False)
+        print(f"Saved data quality summary to {summary_file}")
+
+        if self.samples:
+            samples = pd.concat(self.samples, ignore_index=True)
+            samples = samples[samples.groupby(['rule', 'data_source']).cumcount() < self.config['sample_rows']]
+            samples = samples.sort_values('rule', key=self.positions, kind='stable', ignore_index=True)
+        else:
+            samples = pd.DataFrame(columns=['rule', 'row', 'data_source', 'value'])
+        samples_file = os.path.join(reports_dir, "data_quality_samples.csv")
+        samples.to_csv(samples_file, index=False)
+        print(f"Saved {len(samples)} sample violations to {samples_file}")
+        return summary, samples
@@ -0,0 +1,282 @@
+import os
+import time
+import json
+import shutil
+import pickle
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from analysis import (print_header, clean_dataset, basic_statistics_frame, add_month_labels, add_day_names,
+                      save_monthly_sales, save_daily_sales, save_top_products, save_country_sales)
+from currency import FxRates
+from ingestion import find_raw_files, read_raw_file
+from ranking import top_n, RANKING_CONFIG
+from returns import RETURN_DIMENSIONS, add_year_month, return_totals, add_return_rates, save_return_rates
+
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.dirname(current_dir)
+RAW_DIR = os.path.join(parent_dir, "data", "raw")
+STATE_DIR = os.path.join(parent_dir, "data", "state")
+REPORTS_DIR = os.path.join(parent_dir, "reports")
+VIZ_DIR = os.path.join(parent_dir, "visualizations")
+FX_FILE = os.path.join(parent_dir, "data", "fx", "fx_rates.csv")
+
+# Distinct-value columns kept per file for the basic statistics
+DISTINCT_COLUMNS = ['invoiceno', 'customerid', 'description', 'country']
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def scan(raw_dir, all_files=False):
+    """Current signature (size, mtime) of every raw file main.py would read"""
+    signatures = {}
+    for file_info in find_raw_files(raw_dir, all_files):
+        try:
+            signatures[file_info["path"]] = file_signature(file_info["path"])
+        except FileNotFoundError:
+            continue
+    return signatures
+
+def file_aggregates(df, returns_df):
+    """Mergeable aggregates of one cleaned file: sums, distinct values and date bounds"""
+    state = {'rows': len(df)}
+    has_price = 'totalprice' in df.columns
+    has_dates = 'invoicedate' in df.columns and pd.api.types.is_datetime64_dtype(df['invoicedate'])
+
+    if has_price:
+        state['total_sales'] = df['totalprice'].sum()
+    for column in DISTINCT_COLUMNS:
+        if column in df.columns:
+            state[f'distinct_{column}'] = pd.unique(df[column].dropna())
+
+    if has_dates:
+        state['min_date'] = df['invoicedate'].min()
+        state['max_date'] = df['invoicedate'].max()
+        if has_price:
+            dates = df['invoicedate']
+            state['monthly_sales'] = df.groupby([dates.dt.year.rename('year'),
+                                                 dates.dt.month.rename('month')])['totalprice'].sum()
+            state['daily_sales'] = df.groupby(dates.dt.dayofweek.rename('dayofweek'))['totalprice'].sum()
+
+    if has_price:
+        for column, name in [('description', 'product_sales'), ('country', 'country_sales')]:
+            if column in df.columns:
+                state[name] = df.groupby(column)['totalprice'].sum()
+
+    # Additive return totals; the rates are derived after merging
+    if returns_df is not None and all(col in df.columns and col in returns_df.columns
+                                      for col in ['quantity', 'totalprice']):
+        sales = add_year_month(df)
+        returns_df = add_year_month(returns_df)
+        for name, key in RETURN_DIMENSIONS.items():
+            if key in sales.columns and key in returns_df.columns:
+                state[f'returns_{name}'] = return_totals(sales, returns_df, key)
+
+    return state
+
+def merge_states(states):
+    """Fold the per-file aggregates into the state for the whole dataset"""
+    merged = {'rows': sum(state['rows'] for state in states)}
+    keys = set().union(*[state.keys() for state in states]) if states else set()
+    for key in keys:
+        parts = [state[key] for state in states if key in state]
+        if key == 'total_sales':
+            merged[key] = sum(parts)
+        elif key.startswith('distinct_'):
+            merged[key] = len(pd.unique(np.concatenate(parts)))
+        elif key == 'min_date':
+            merged[key] = min((part for part in parts if pd.notna(part)), default=pd.NaT)
+        elif key == 'max_date':
+            merged[key] = max((part for part in parts if pd.notna(part)), default=pd.NaT)
+        elif key != 'rows':
+            merged[key] = pd.concat(parts).groupby(level=list(range(parts[0].index.nlevels))).sum()
+    return merged
+
+def write_reports(merged, reports_dir, viz_dir):
+    """Write the report set from the merged state (same files analyze_data writes)"""
+    total_sales = merged.get('total_sales', 'N/A')
+    counts = [merged.get(f'distinct_{column}', 'N/A') for column in DISTINCT_COLUMNS]
+    if pd.notna(merged.get('min_date', pd.NaT)):
+        date_range = f"{merged['min_date']} to {merged['max_date']}"
+    else:
+        date_range = 'N/A'
+    stats = basic_statistics_frame(total_sales, *counts, date_range)
+    stats.to_csv(os.path.join(reports_dir, "basic_statistics.csv"), index=False)
+
+    if 'monthly_sales' in merged:
+        save_monthly_sales(add_month_labels(merged['monthly_sales'].reset_index()), reports_dir, viz_dir)
+        save_daily_sales(add_day_names(merged['daily_sales'].reset_index()), reports_dir, viz_dir)
+    if 'product_sales' in merged:
+        top = top_n(merged['product_sales'].reset_index(), 'totalprice', RANKING_CONFIG['top_n'])
+        save_top_products(top, reports_dir, viz_dir)
+    if 'country_sales' in merged:
+        top = top_n(merged['country_sales'].reset_index(), 'totalprice', RANKING_CONFIG['top_n'])
+        save_country_sales(top, reports_dir, viz_dir)
+
+    for name, key in RETURN_DIMENSIONS.items():
+        if f'returns_{name}' in merged:
+            totals = merged[f'returns_{name}'].astype({'return_lines': int})
+            save_return_rates(name, key, add_return_rates(totals), reports_dir)
+
+    plt.close('all')
+
+class ReportWatcher:
+    """Incrementally fold new or changed raw files into persisted report state
+
+    Every raw file keeps its own aggregates under data/state, so a new file costs
+    one read and clean of that file, a changed file replaces its previous
+    contribution and a deleted one drops it. Reports are rebuilt from the merged
+    aggregates and swapped into place file by file with os.replace.
+    """
+
+    def __init__(self, raw_dir=RAW_DIR, state_dir=STATE_DIR, reports_dir=REPORTS_DIR, viz_dir=VIZ_DIR,
+                 all_files=False):
+        self.raw_dir = raw_dir
+        self.all_files = all_files
+        self.state_dir = state_dir
+        self.reports_dir = reports_dir
+        self.viz_dir = viz_dir
+        self.index_file = os.path.join(state_dir, "index.json")
+        os.makedirs(os.path.join(state_dir, "files"), exist_ok=True)
+        self.fx = FxRates.from_file(FX_FILE)
+        self.index = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file) as f:
+                self.index = json.load(f)
+
+    def state_file(self, path):
+        return os.path.join(self.state_dir, "files", hashlib.sha1(path.encode()).hexdigest()[:16] + ".pkl")
+
+    def pending(self, signatures):
+        """Files that are new or changed since they were last folded in, and files that disappeared"""
+        changed = [path for path, signature in signatures.items()
+                   if self.index.get(path, {}).get("signature") != signature]
+        removed = [path for path in self.index if path not in signatures]
+        return changed, removed
+
+    def save_index(self):
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp_file, self.index_file)
+
+    def drop_state(self, entry):
+        """Delete the persisted aggregates of an index entry, if it has any"""
+        if "state" in entry:
+            state_file = os.path.join(self.state_dir, "files", entry["state"])
+            if os.path.exists(state_file):
+                os.remove(state_file)
+
+    def ingest(self, path, signature):
+        """Read, clean and aggregate one raw file, and persist its aggregates"""
+        name = os.path.basename(path)
+        file_info = {"path": path, "name": name, "type": "xlsx" if name.endswith(".xlsx") else "csv"}
+        df, _ = read_raw_file(file_info)
+        if df is None:
+            # Remember the failure with its signature, so the file is retried only once it changes
+            self.drop_state(self.index.get(path, {}))
+            self.index[path] = {"signature": signature, "failed": True}
+            return False
+        df_clean, df_returns = clean_dataset(df, name, fx=self.fx)
+        state = file_aggregates(df_clean, df_returns)
+
+        state_file = self.state_file(path)
+        with open(state_file + ".tmp", "wb") as f:
+            pickle.dump(state, f)
+        os.replace(state_file + ".tmp", state_file)
+        self.index[path] = {"signature": signature, "state": os.path.basename(state_file), "rows": state['rows']}
+        return True
+
+    def refresh(self, changed, removed, signatures):
+        """Fold the changes into the state and rewrite the reports"""
+        print_header(f"REFRESH: {len(changed)} new/changed, {len(removed)} removed")
+        start_time = time.time()
+
+        for path in removed:
+            self.drop_state(self.index.pop(path))
+            print(f"Dropped {os.path.basename(path)}")
+
+        for path in changed:
+            if not self.ingest(path, signatures[path]):
+                print(f"Could not ingest {path}, will retry when it changes")
+        self.save_index()
+
+        states = []
+        for entry in self.index.values():
+            if entry.get("failed"):
+                continue
+            with open(os.path.join(self.state_dir, "files", entry["state"]), "rb") as f:
+                states.append(pickle.load(f))
+        merged = merge_states(states)
+
+        # Render into a staging area, then swap each output into place
+        staging = os.path.join(self.state_dir, "staging")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging_reports = os.path.join(staging, "reports")
+        staging_viz = os.path.join(staging, "visualizations")
+        os.makedirs(staging_reports)
+        os.makedirs(staging_viz)
+        write_reports(merged, staging_reports, staging_viz)
+
+        os.makedirs(self.reports_dir, exist_ok=True)
+        os.makedirs(self.viz_dir, exist_ok=True)
+        for staging_dir, target_dir in [(staging_reports, self.reports_dir), (staging_viz, self.viz_dir)]:
+            for name in os.listdir(staging_dir):
+                os.replace(os.path.join(staging_dir, name), os.path.join(target_dir, name))
+        shutil.rmtree(staging, ignore_errors=True)
+
+        print(f"\nReports refreshed from {len(states)} files ({merged['rows']:,} rows) "
+              f"in {time.time() - start_time:.2f} seconds")
+
+    def run(self, interval=30, debounce=10, once=False):
+        """Poll the raw folder and refresh once a burst of arrivals has settled"""
+        print_header("WATCHING FOR NEW DATA")
+        print(f"Watching {self.raw_dir} every {interval}s (debounce {debounce}s)")
+
+        last_signatures = None
+        stable_since = None
+        while True:
+            signatures = scan(self.raw_dir, self.all_files)
+            changed, removed = self.pending(signatures)
+
+            if changed or removed:
+                # Wait until the folder has stopped changing for `debounce` seconds
+                if signatures != last_signatures:
+                    last_signatures = signatures
+                    stable_since = time.time()
+                    if not once:
+                        print(f"Detected {len(changed)} new/changed and {len(removed)} removed files, waiting for the burst to settle")
+                if once or time.time() - stable_since >= debounce:
+                    self.refresh(changed, removed, signatures)
+                    last_signatures = None
+            elif once:
+                print("Reports are up to date.")
+
+            if once:
+                return
+            time.sleep(min(interval, debounce) if changed or removed else interval)
+
+def main():
+    """Run the watch-folder daemon"""
+    parser = argparse.ArgumentParser(description="Incrementally refresh reports as new raw files arrive")
+    parser.add_argument("--interval", type=float, default=30, help="Seconds between folder scans")
+    parser.add_argument("--debounce", type=float, default=10,
+                        help="Seconds the folder must be unchanged before a refresh")
+    parser.add_argument("--once", action="store_true", help="Fold in pending changes once and exit")
+    parser.add_argument("--ingest", choices=["sequential", "concurrent"], default="sequential",
+                        help="Watch the files main.py reads in this ingestion mode (concurrent: every CSV/XLSX)")
+    args = parser.parse_args()
+
+    watcher = ReportWatcher(all_files=args.ingest == "concurrent")
+    try:
+        watcher.run(args.interval, args.debounce, args.once)
+    except KeyboardInterrupt:
+        print("\nWatcher stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -24,76 +24,80 @@ import warnings
 warnings.filterwarnings('ignore')
 """
 
-# Load data cell
+# Settings cell
+settings = """
+# Reports written by the main analysis script (compact, precomputed aggregates)
+REPORTS_DIR = "reports"
+
+# Set to True to also load the full line-item data (slow and memory hungry on the full history)
+LOAD_LINE_ITEMS = False
+
+# Only these columns are read when line items are loaded
+LINE_ITEM_COLUMNS = ['invoicedate', 'invoiceno', 'customerid', 'description', 'country', 'totalprice']
+"""
+
+# Load aggregates cell
 load_data = """
-# Find the most recent combined data file
-combined_files = glob.glob("data/cleaned/combined_sales_data_*.csv")
+def load_report(name):
+    path = os.path.join(REPORTS_DIR, f"{name}.csv")
+    if not os.path.exists(path):
+        print(f"Report not found: {path}")
+        return None
+    return pd.read_csv(path)
+
+basic_statistics = load_report("basic_statistics")
+monthly_sales = load_report("monthly_sales")
+daily_sales = load_report("daily_sales")
+top_products = load_report("top_products")
+country_sales = load_report("country_sales")
 
-if not combined_files:
-    print("No combined dataset found. Run the main analysis script first.")
+if basic_statistics is None:
+    print("No reports found. Run the main analysis script first.")
 else:
-    # Load the most recent file
-    latest_file = max(combined_files, key=os.path.getmtime)
-    print(f"Loading dataset: {latest_file}")
-    
-    # Load the dataset
-    df = pd.read_csv(latest_file)
-    
-    # Convert date to datetime
-    if 'invoicedate' in df.columns:
-        df['invoicedate'] = pd.to_datetime(df['invoicedate'])
-        # Extract date components
-        df['year'] = df['invoicedate'].dt.year
-        df['month'] = df['invoicedate'].dt.month
-        df['day'] = df['invoicedate'].dt.day
-        df['dayofweek'] = df['invoicedate'].dt.dayofweek
-        df['dayname'] = df['invoicedate'].dt.day_name()
-        df['year_month'] = df['invoicedate'].dt.strftime('%Y-%m')
-    
-    # Preview the data
-    print("Data preview:")
-    display(df.head())
-    print(f"Shape: {df.shape}")
+    # Metadata: which reports are available and when they were generated
+    report_files = sorted(glob.glob(os.path.join(REPORTS_DIR, "*.csv")))
+    metadata = pd.DataFrame({
+        'report': [os.path.basename(f) for f in report_files],
+        'size_kb': [round(os.path.getsize(f) / 1024, 1) for f in report_files],
+        'generated': [datetime.fromtimestamp(os.path.getmtime(f)).strftime('%Y-%m-%d %H:%M') for f in report_files],
+    })
+    display(metadata)
 """
 
 # Sales overview cell
 sales_overview = """
-if 'df' in globals():
-    # Calculate key metrics
-    total_sales = df['totalprice'].sum()
-    total_orders = df['invoiceno'].nunique()
-    
-    # Display metrics
-    print(f"Total Sales: ${total_sales:,.2f}")
-    print(f"Number of Orders: {total_orders:,}")
-    
-    if 'customerid' in df.columns:
-        total_customers = df['customerid'].nunique()
-        print(f"Number of Customers: {total_customers:,}")
-    
+if basic_statistics is not None:
+    # Key metrics
+    display(basic_statistics.set_index('Metric'))
+
+if monthly_sales is not None:
     # Monthly sales trend
-    if 'year_month' in df.columns:
-        monthly_sales = df.groupby('year_month')['totalprice'].sum().reset_index()
-        monthly_sales = monthly_sales.sort_values('year_month')
-        
-        plt.figure(figsize=(14, 6))
-        plt.plot(monthly_sales['year_month'], monthly_sales['totalprice'], marker='o')
-        plt.title("Monthly Sales Trend", fontsize=16)
-        plt.xlabel("Month")
-        plt.ylabel("Sales ($)")
-        plt.xticks(rotation=45)
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.show()
+    plt.figure(figsize=(14, 6))
+    plt.plot(monthly_sales['period'], monthly_sales['totalprice'], marker='o')
+    plt.title("Monthly Sales Trend", fontsize=16)
+    plt.xlabel("Month")
+    plt.ylabel("Sales ($)")
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.show()
+
+if daily_sales is not None:
+    # Sales by day of week
+    plt.figure(figsize=(12, 6))
+    plt.bar(daily_sales['day_name'], daily_sales['totalprice'])
+    plt.title("Sales by Day of Week", fontsize=16)
+    plt.xlabel("Day")
+    plt.ylabel("Sales ($)")
+    plt.grid(axis='y', alpha=0.3)
+    plt.tight_layout()
+    plt.show()
 """
 
 # Product analysis cell
 product_analysis = """
-if 'df' in globals() and 'description' in df.columns:
+if top_products is not None:
     # Top products by revenue
-    top_products = df.groupby('description')['totalprice'].sum().reset_index()
-    top_products = top_products.sort_values('totalprice', ascending=False).head(10)
-    
     plt.figure(figsize=(12, 8))
     plt.barh(top_products['description'], top_products['totalprice'])
     plt.title("Top 10 Products by Revenue", fontsize=16)
@@ -110,11 +114,8 @@ if 'df' in globals() and 'description' in df.columns:
 
 # Country analysis cell
 country_analysis = """
-if 'df' in globals() and 'country' in df.columns:
+if country_sales is not None:
     # Sales by country
-    country_sales = df.groupby('country')['totalprice'].sum().reset_index()
-    country_sales = country_sales.sort_values('totalprice', ascending=False).head(10)
-    
     plt.figure(figsize=(12, 6))
     plt.bar(country_sales['country'], country_sales['totalprice'])
     plt.title("Top 10 Countries by Sales", fontsize=16)
@@ -129,10 +130,39 @@ if 'df' in globals() and 'country' in df.columns:
     display(country_sales)
 """
 
+# Optional line-item data cell
+line_items = """
+def load_line_items(columns=LINE_ITEM_COLUMNS, chunksize=None):
+    # Load the most recent combined dataset, reading only the given columns.
+    # With chunksize set, returns an iterator of chunks instead of one frame.
+    combined_files = glob.glob("data/cleaned/combined_sales_data_*.csv")
+    if not combined_files:
+        print("No combined dataset found. Run the main analysis script first.")
+        return None
+    
+    latest_file = max(combined_files, key=os.path.getmtime)
+    print(f"Loading dataset: {latest_file}")
+    
+    available = pd.read_csv(latest_file, nrows=0).columns
+    usecols = [col for col in columns if col in available]
+    dtypes = {col: 'category' for col in ['country', 'description'] if col in usecols}
+    dates = ['invoicedate'] if 'invoicedate' in usecols else None
+    return pd.read_csv(latest_file, usecols=usecols, dtype=dtypes, parse_dates=dates, chunksize=chunksize)
+
+if LOAD_LINE_ITEMS:
+    df = load_line_items()
+    if df is not None:
+        display(df.head())
+        print(f"Shape: {df.shape}")
+else:
+    print("Line items not loaded. Set LOAD_LINE_ITEMS = True in the settings cell to load them.")
+"""
+
 # Add cells to the notebook
-nb.cells.append(nbf.v4.new_markdown_cell("# Online Store Sales Analysis\n\nThis notebook analyzes e-commerce sales data from the cleaned dataset."))
+nb.cells.append(nbf.v4.new_markdown_cell("# Online Store Sales Analysis\n\nThis notebook explores e-commerce sales using the aggregates precomputed by the main analysis script."))
 nb.cells.append(nbf.v4.new_code_cell(imports))
-nb.cells.append(nbf.v4.new_markdown_cell("## Load and Prepare Data"))
+nb.cells.append(nbf.v4.new_code_cell(settings))
+nb.cells.append(nbf.v4.new_markdown_cell("## Load Precomputed Reports"))
 nb.cells.append(nbf.v4.new_code_cell(load_data))
 nb.cells.append(nbf.v4.new_markdown_cell("## Sales Overview"))
 nb.cells.append(nbf.v4.new_code_cell(sales_overview))
@@ -140,6 +170,8 @@ nb.cells.append(nbf.v4.new_markdown_cell("## Product Analysis"))
 nb.cells.append(nbf.v4.new_code_cell(product_analysis))
 nb.cells.append(nbf.v4.new_markdown_cell("## Geographic Analysis"))
 nb.cells.append(nbf.v4.new_code_cell(country_analysis))
+nb.cells.append(nbf.v4.new_markdown_cell("## Line-Item Data (optional)\n\nFor ad-hoc analysis beyond the reports, set `LOAD_LINE_ITEMS = True`. Only `LINE_ITEM_COLUMNS` are read; pass `chunksize` to `load_line_items` to stream the data in chunks."))
+nb.cells.append(nbf.v4.new_code_cell(line_items))
 
 # Write the notebook to a file
 notebook_filename = 'sales_analysis.ipynb'
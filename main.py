@@ -2,6 +2,8 @@ import os
 import sys
 import time
 import glob
+import shlex
+import argparse
 from datetime import datetime
 
 def print_separator():
@@ -103,9 +105,21 @@ def main():
     # Create necessary directories
     create_directories()
     
+    # Command-line options are passed through to the analysis script
+    analysis_args = sys.argv[1:]
+    
     # Find and update data file paths
     files_found = find_data_files()
     
+    # Only --ingest is needed here, the rest is left to the analysis script
+    ingest_parser = argparse.ArgumentParser(add_help=False)
+    ingest_parser.add_argument("--ingest")
+    ingest_args, _ = ingest_parser.parse_known_args(analysis_args)
+    
+    if ingest_args.ingest == "concurrent":
+        # Concurrent ingestion reads every CSV/XLSX in data/raw, whatever its name
+        files_found = bool(glob.glob("data/raw/**/*.csv", recursive=True) + glob.glob("data/raw/**/*.xlsx", recursive=True))
+    
     if not files_found:
         print("\n⚠️ Not all required data files were found.")
         print("Please make sure you have at least one retail file (online_retail*.csv/xlsx)")
@@ -113,7 +127,7 @@ def main():
         return
     
     # Run the analysis script
-    run_script("code/analysis.py", "DATA ANALYSIS")
+    run_script(" ".join(["code/analysis.py"] + [shlex.quote(arg) for arg in analysis_args]), "DATA ANALYSIS")
     
     print_header("ANALYSIS COMPLETED")
     print("Check the 'reports' and 'visualizations' directories for results.")